@@ -0,0 +1,107 @@
+# Fused aggregation kernel computing, in one pass over the hourly rows, the sum, minimum, maximum and number of values of
+# every column per segment of consecutive rows (such as the rows of each day), together with the split of some columns
+# (such as BESS and Grid) into their negative and positive parts. The loop is compiled with Numba when it is installed;
+# otherwise NumPy's reduceat computes the same statistics over the segment boundaries. Blank (NaN) values are skipped,
+# like pandas' groupby aggregations do
+
+# Importing the necessary libraries
+import numpy as np
+
+try:
+    import numba # Optional, only used to compile the single-pass loop
+except ImportError:
+    numba = None
+
+# Class holding the statistics of every segment, as arrays of one row per segment and one column per aggregated column
+class SegmentStatistics:
+    def __init__(self, sums, minimums, maximums, counts, charge, discharge):
+        self.sums = sums
+        self.minimums = minimums # NaN for a column without any value in the segment
+        self.maximums = maximums
+        self.counts = counts # Number of (non-blank) values
+        self.charge = charge # Sums of the negative values of every split column per segment, one column per split column
+        self.discharge = discharge # Sums of their positive values
+
+# Function to return the first row of every run of equal keys in sorted keys (such as the Day column of sorted rows)
+def segment_starts(keys):
+    keys = np.asarray(keys)
+    if len(keys) == 0:
+        return np.zeros(0, dtype = np.int64)
+    return np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+
+# Function to compute the statistics of every segment with NumPy, one reduceat per statistic over the stacked columns
+def reduce_numpy(values, starts, splits):
+    valid = ~np.isnan(values)
+    if valid.all():
+        filled = values
+        counts = np.diff(np.append(starts, len(values)))[:, None].repeat(values.shape[1], axis = 1)
+    else:
+        filled = np.where(valid, values, 0.0)
+        counts = np.add.reduceat(valid, starts, axis = 0, dtype = np.int64)
+    sums = np.add.reduceat(filled, starts, axis = 0)
+    minimums = np.fmin.reduceat(values, starts, axis = 0)
+    maximums = np.fmax.reduceat(values, starts, axis = 0)
+    if len(splits) == 0:
+        charge = discharge = np.zeros((len(starts), 0))
+    else:
+        charge = np.add.reduceat(np.minimum(filled[:, splits], 0.0), starts, axis = 0)
+        discharge = np.add.reduceat(np.maximum(filled[:, splits], 0.0), starts, axis = 0)
+    return SegmentStatistics(sums, minimums, maximums, counts, charge, discharge)
+
+# Function to compute the statistics of every segment in a single loop over the rows, compiled by Numba
+def reduce_loop(values, starts, splits):
+    rows, columns = values.shape
+    segments = len(starts)
+    slots = np.full(columns, -1) # Index of every column among the split columns, -1 for the columns that are not split
+    for i in range(len(splits)):
+        slots[splits[i]] = i
+    sums = np.zeros((segments, columns))
+    minimums = np.full((segments, columns), np.nan)
+    maximums = np.full((segments, columns), np.nan)
+    counts = np.zeros((segments, columns), dtype = np.int64)
+    charge = np.zeros((segments, len(splits)))
+    discharge = np.zeros((segments, len(splits)))
+    for segment in range(segments):
+        stop = starts[segment + 1] if segment + 1 < segments else rows
+        for row in range(starts[segment], stop):
+            for column in range(columns):
+                value = values[row, column]
+                if np.isnan(value):
+                    continue
+                sums[segment, column] += value
+                counts[segment, column] += 1
+                if not value >= minimums[segment, column]: # Also true while the minimum is still NaN
+                    minimums[segment, column] = value
+                if not value <= maximums[segment, column]:
+                    maximums[segment, column] = value
+                slot = slots[column]
+                if slot >= 0:
+                    if value < 0:
+                        charge[segment, slot] += value
+                    else:
+                        discharge[segment, slot] += value
+    return sums, minimums, maximums, counts, charge, discharge
+
+if numba is not None:
+    reduce_loop = numba.njit(cache = True, nogil = True)(reduce_loop)
+
+# Function to return columns (such as float32 hourly values) as one float64 matrix of one row per row of the data,
+# which the kernel reads in a single pass and accumulates in double precision
+def stack_columns(columns):
+    values = np.empty((len(columns[0]) if columns else 0, len(columns)))
+    for i, column in enumerate(columns):
+        values[:, i] = column # Converted while copied, without a float64 copy of each column first
+    return values
+
+# Function to compute the sum, minimum, maximum and number of values of every column of a float64 matrix (see
+# stack_columns) over every segment of rows starting at the given rows (see segment_starts), and the split of the columns
+# at the indices in splits into their negative and positive parts. Without any row or segment, the arrays have no rows
+def segment_statistics(values, starts, splits = ()):
+    starts = np.asarray(starts, dtype = np.int64)
+    splits = np.asarray(splits, dtype = np.int64)
+    if len(starts) == 0 or len(values) == 0:
+        empty = np.zeros((0, values.shape[1]))
+        return SegmentStatistics(empty, empty, empty, empty.astype(np.int64), np.zeros((0, len(splits))), np.zeros((0, len(splits))))
+    if numba is not None:
+        return SegmentStatistics(*reduce_loop(values, starts, splits))
+    return reduce_numpy(values, starts, splits)
@@ -0,0 +1,219 @@
+# Local HTTP endpoint answering the dashboard's queries without a browser session, as JSON or as an Arrow IPC stream
+#
+#   GET /bounds                       first and last dates of the data and its version
+#   GET /daily?date=2010-01-05        hourly rows, energy totals and lowest/highest power of a day, optionally with min_hour
+#                                     and max_hour
+#   GET /range?start=2010-01-01&end=2010-12-31
+#                                     per-period sum, minimum, maximum and mean of the resolution tier the Custom Date Range
+#                                     graphs use, and the energy totals and lowest/highest power of the range
+#   GET /kpis?start=2010-01-01&end=2010-12-31
+#                                     every KPI (see kpis.py) per period of the resolution tier of the range, at least daily
+#
+# Every query also returns the KPIs over its whole selection. /daily, /range and /kpis take an optional comma-separated variables list (all variables by default) and format=json (default)
+# or format=arrow, which returns the series as an Arrow IPC stream with the totals in its schema metadata (needs pyarrow)
+#
+# The dashboard starts the endpoint next to its own data store (see get_live_store in dashboard.py), so it answers from
+# the same cached in-memory data. It can also be run on its own: python api.py [workbook] [port]
+
+# Importing the necessary libraries
+import datetime
+import json
+import logging
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from ingest import LiveStore
+from power_data import VARIABLES, load_power_store
+from queries import check_variables, daily_series, day_timestamps, energy_summary, range_series
+from kpis import KPIS, kpi_ratings, kpi_series, kpi_totals
+
+API_HOST = "127.0.0.1" # Only local tools may query the data
+API_PORT = 8700 # Outside the ports Streamlit moves on to (8502 onwards) when 8501 is taken by another server
+
+logger = logging.getLogger(__name__)
+
+# Function to return a query parameter as a date, raising ValueError when it is missing or malformed
+def date_parameter(params, name):
+    if name not in params:
+        raise ValueError(f"Missing parameter: {name}")
+    try:
+        return datetime.date.fromisoformat(params[name][0])
+    except ValueError:
+        raise ValueError(f"Parameter {name} must be a date in YYYY-MM-DD format") from None
+
+# Function to return a query parameter as an hour of the day, or None when it is not given
+def hour_parameter(params, name):
+    if name not in params:
+        return None
+    try:
+        return int(params[name][0])
+    except ValueError:
+        raise ValueError(f"Parameter {name} must be a whole hour") from None
+
+# Function to return the requested variables, all of them when none are given
+def variables_parameter(params):
+    if "variables" not in params:
+        return list(VARIABLES)
+    return check_variables([variable for value in params["variables"] for variable in value.split(",") if variable])
+
+# Function to check that a date range lies within the data, raising ValueError otherwise
+def check_dates(store, start_date, end_date):
+    first_date, last_date = store.date_bounds()
+    if start_date > end_date:
+        raise ValueError("The start date is after the end date")
+    if start_date < first_date or end_date > last_date:
+        raise ValueError(f"Dates must lie between {first_date} and {last_date}")
+
+# Function to answer a /daily query with the hourly rows and totals of a day
+def daily_query(store, params, ratings):
+    date = date_parameter(params, "date")
+    check_dates(store, date, date)
+    min_hour, max_hour = hour_parameter(params, "min_hour"), hour_parameter(params, "max_hour")
+    if (min_hour is None) != (max_hour is None):
+        raise ValueError("Parameters min_hour and max_hour must be given together")
+    if min_hour is not None and min_hour > max_hour:
+        raise ValueError("Parameter min_hour is after max_hour")
+    variables = variables_parameter(params)
+    slct = int(store.day_numbers(date))
+
+    df = daily_series(store, slct, min_hour, max_hour)
+    series = df[["Hours"] + variables].reset_index()
+    summary = energy_summary(store, slct, slct, min_hour, max_hour)
+    kpis = kpi_totals(store, slct, slct, min_hour, max_hour, ratings)
+    meta = dict(date = date.isoformat(), min_hour = min_hour, max_hour = max_hour, resolution = "hour", kpis = json_numbers(kpis, KPIS))
+    return series, meta, summary, variables
+
+# Function to answer a /range query with the resolution tier rows and totals of a date range
+def range_query(store, params, ratings):
+    start_date, end_date = date_parameter(params, "start"), date_parameter(params, "end")
+    check_dates(store, start_date, end_date)
+    variables = variables_parameter(params)
+    start_slct, end_slct = store.day_numbers([start_date, end_date]).tolist()
+
+    tier, df = range_series(store, start_slct, end_slct)
+    series = df[[f"{variable}_{statistic}" for variable in variables for statistic in ['sum', 'min', 'max', 'mean']]].reset_index()
+    series.insert(0, "Timestamp", day_timestamps(store, series["Day"]))
+    summary = energy_summary(store, start_slct, end_slct)
+    kpis = kpi_totals(store, start_slct, end_slct, ratings = ratings)
+    meta = dict(start = start_date.isoformat(), end = end_date.isoformat(), resolution = tier, kpis = json_numbers(kpis, KPIS))
+    return series, meta, summary, variables
+
+# Function to answer a /kpis query with every KPI per period of a date range and over the whole range, with the ratings used
+def kpis_query(store, params, ratings):
+    start_date, end_date = date_parameter(params, "start"), date_parameter(params, "end")
+    check_dates(store, start_date, end_date)
+    variables = variables_parameter(params)
+    start_slct, end_slct = store.day_numbers([start_date, end_date]).tolist()
+
+    tier, df = kpi_series(store, start_slct, end_slct, ratings)
+    series = df.reset_index()
+    series.insert(0, "Timestamp", day_timestamps(store, series["Day"]))
+    summary = energy_summary(store, start_slct, end_slct)
+    kpis = kpi_totals(store, start_slct, end_slct, ratings = ratings)
+    meta = dict(start = start_date.isoformat(), end = end_date.isoformat(), resolution = tier, kpis = json_numbers(kpis, KPIS),
+                units = {name: unit for name, (unit, _) in KPIS.items()}, ratings = kpi_ratings(store, ratings))
+    return series, meta, summary, variables
+
+QUERIES = {"/daily": daily_query, "/range": range_query, "/kpis": kpis_query}
+
+# Function to return the metadata and the energy summary of a query, for the requested variables, as a JSON-serializable dictionary
+def query_header(store, meta, summary, variables):
+    return dict(
+        meta,
+        version = str(store.version),
+        unit = "MWh",
+        totals = summary.energies(variables),
+        power = dict(min = json_numbers(summary.minimum, variables), max = json_numbers(summary.maximum, variables)),
+        bess = dict(charging = summary.charging, discharging = summary.discharging)
+    )
+
+# Function to return values of the given variables (or KPIs) with blank (NaN) values as None, which JSON can represent
+def json_numbers(values, variables):
+    return {variable: None if values[variable] != values[variable] else values[variable] for variable in variables}
+
+# Function to encode a query result as JSON, with the series in pandas' split orientation (columns and rows of values)
+def encode_json(header, series):
+    body = dict(header, series = json.loads(series.to_json(orient = "split", index = False, date_format = "iso")))
+    return "application/json", json.dumps(body).encode()
+
+# Function to encode a query result as an Arrow IPC stream, with the metadata and totals kept in the schema metadata
+def encode_arrow(header, series):
+    import pyarrow as pa # Imported here so pyarrow is only needed by clients asking for Arrow
+    table = pa.Table.from_pandas(series, preserve_index = False)
+    table = table.replace_schema_metadata(dict(table.schema.metadata or {}, dashboard = json.dumps(header)))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return "application/vnd.apache.arrow.stream", sink.getvalue().to_pybytes()
+
+ENCODERS = {"json": encode_json, "arrow": encode_arrow}
+
+# Class handling the requests of the query endpoint, answering from the current version of the server's live store
+class QueryHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        store = self.server.live.current # One snapshot per request, so an append while answering cannot mix versions
+        try:
+            if url.path == "/bounds":
+                first_date, last_date = store.date_bounds()
+                body = dict(first_date = first_date.isoformat(), last_date = last_date.isoformat(), version = str(store.version), variables = VARIABLES,
+                            kpis = list(KPIS))
+                return self.send_body(200, "application/json", json.dumps(body).encode())
+            if url.path not in QUERIES:
+                return self.send_error_json(404, f"Unknown path: {url.path} (expected /bounds, /daily, /range or /kpis)")
+            encoding = params.get("format", ["json"])[0]
+            if encoding not in ENCODERS:
+                raise ValueError("Parameter format must be json or arrow")
+            series, meta, summary, variables = QUERIES[url.path](store, params, self.server.ratings)
+            self.send_body(200, *ENCODERS[encoding](query_header(store, meta, summary, variables), series))
+        except ValueError as error:
+            self.send_error_json(400, str(error))
+        except ImportError:
+            self.send_error_json(501, "Arrow responses need pyarrow installed")
+        except Exception as error: # Any other failure still gets a response rather than a dropped connection
+            logger.exception("Query %s failed", self.path)
+            self.send_error_json(500, f"Internal error: {error}")
+
+    # Method to send a response body with its content type
+    def send_body(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Method to send an error as a JSON object with a message
+    def send_error_json(self, status, message):
+        self.send_body(status, "application/json", json.dumps(dict(error = message)).encode())
+
+    # Method to route the access log through logging instead of printing every request to stderr
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+# Function to start serving queries on the live store from a daemon thread, with the ratings its KPIs are relative to
+# (estimated from the data when None), returning the server (or None, logged, when the port cannot be bound, for example
+# because another dashboard process already serves it)
+def start_query_server(live, host = API_HOST, port = API_PORT, ratings = None):
+    try:
+        server = ThreadingHTTPServer((host, port), QueryHandler)
+    except OSError as error:
+        logger.warning("Query endpoint not started on %s:%s: %s", host, port, error)
+        return None
+    server.daemon_threads = True
+    server.live = live
+    server.ratings = ratings
+    threading.Thread(target = server.serve_forever, name = "query-server", daemon = True).start()
+    return server
+
+# Serving a workbook on its own from the command line
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    store = load_power_store(args[0]) if args else load_power_store()
+    port = int(args[1]) if len(args) > 1 else API_PORT
+    server = ThreadingHTTPServer((API_HOST, port), QueryHandler)
+    server.live = LiveStore(store)
+    server.ratings = None
+    print(f"Serving queries on http://{API_HOST}:{port}")
+    server.serve_forever()
@@ -0,0 +1,63 @@
+# Comparison of two results files of benchmarks/suite.py, typically the runs of a base commit and of a change,
+# printing the relative change of every measurement and failing when a time or memory measurement regressed
+#
+# Usage: python benchmarks/compare.py <base results> <new results> [--threshold 0.1]
+
+# Importing the necessary libraries
+import argparse
+import json
+import sys
+
+THRESHOLD = 0.1 # Relative increase of a time or memory measurement reported as a regression
+NOISE_FLOOR = {"s": 1e-3, "bytes": 1024} # Absolute differences below these are never reported as regressions
+
+# Function to read a results file into a dictionary of values keyed by scenario, metric and case
+def read_results(path):
+    with open(path) as handle:
+        document = json.load(handle)
+    values = {}
+    for record in document["results"]:
+        key = (record["years"], record["sites"], record["backend"], record["metric"], record["case"])
+        values[key] = (record["value"], record["unit"])
+    return document, values
+
+# Function to return the rows of the comparison and whether any of them is a regression
+def compare(base, new, threshold = THRESHOLD):
+    rows = []
+    regressed = False
+    for key in sorted(base.keys() & new.keys(), key = str):
+        (base_value, unit), (new_value, _) = base[key], new[key]
+        change = (new_value - base_value) / base_value if base_value else 0.0
+        regression = change > threshold and new_value - base_value > NOISE_FLOOR.get(unit, 0) and not key[3].endswith(".payload")
+        regressed = regressed or regression
+        rows.append((key, base_value, new_value, unit, change, regression))
+    return rows, regressed
+
+# Function to format a measurement in a readable unit
+def format_value(value, unit):
+    if unit == "s":
+        return f"{value * 1000:.2f} ms"
+    if unit == "bytes":
+        return f"{value / 1024:.1f} KB"
+    return f"{value}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Compare two benchmark results files")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type = float, default = THRESHOLD, help = "relative increase reported as a regression")
+    args = parser.parse_args()
+
+    base_document, base = read_results(args.base)
+    new_document, new = read_results(args.new)
+    print(f"base: {base_document['commit']} ({base_document['time']})")
+    print(f"new:  {new_document['commit']} ({new_document['time']})")
+
+    rows, regressed = compare(base, new, args.threshold)
+    for (years, sites, backend, metric, case), base_value, new_value, unit, change, regression in rows:
+        flag = "  REGRESSION" if regression else ""
+        print(f"{years:>3}y {sites:>2}s {backend:<12} {metric:<32} {case:<14} {format_value(base_value, unit):>12} {format_value(new_value, unit):>12} {change:>+8.1%}{flag}")
+    unmatched = len(base.keys() ^ new.keys())
+    if unmatched:
+        print(f"{unmatched} measurements are only in one of the files (different settings) and were not compared")
+    sys.exit(1 if regressed else 0)
@@ -0,0 +1,70 @@
+# Check that the fast paths of the data store give the same results as the slow paths they replace: the single-pass
+# aggregation loop (reduce_loop, compiled by Numba when it is installed) against NumPy's reduceat (reduce_numpy), and a
+# store grown by PowerStore.append against a store rebuilt from all of its rows. Exits with status 1 on any mismatch
+#
+# Usage: python benchmarks/consistency_check.py [years ...]
+
+# Importing the necessary libraries
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aggregation import reduce_loop, reduce_numpy, segment_starts, stack_columns
+from power_data import SPLIT_INDICES, VARIABLES, PowerStore, compact_frame
+from synthetic import synthetic_power_data
+
+BLANK_ROWS = 50 # Number of values blanked (set to NaN) in every data set, as the kernel skips them
+APPEND_CHUNKS = 4 # Number of appends growing the store from the first half of the rows
+
+# Function to return the names of the arrays that differ between two dictionaries of arrays
+def mismatches(expected, actual):
+    return [name for name in expected if not np.allclose(np.asarray(expected[name], dtype = np.float64),
+                                                         np.asarray(actual[name], dtype = np.float64), equal_nan = True)]
+
+# Function to compare reduce_loop with reduce_numpy over the rows of every day, returning the statistics that differ
+def check_kernel(df):
+    values = stack_columns([df[variable].to_numpy() for variable in VARIABLES])
+    starts = segment_starts(df["Day"].to_numpy())
+    splits = np.asarray(SPLIT_INDICES, dtype = np.int64)
+    names = ["sums", "minimums", "maximums", "counts", "charge", "discharge"]
+    loop = dict(zip(names, reduce_loop(values, starts, splits)))
+    vectorized = reduce_numpy(values, starts, splits)
+    return mismatches({name: getattr(vectorized, name) for name in names}, loop)
+
+# Function to compare a store grown by appends (one of them overlapping rows already stored, which must be skipped) with
+# a store built from all the rows at once, returning the structures that differ
+def check_append(df):
+    half = len(df) // 2
+    store = PowerStore(df.iloc[:half])
+    for chunk in np.array_split(np.arange(half - 24, len(df)), APPEND_CHUNKS): # The first chunk repeats the last stored day
+        store = store.append(df.iloc[chunk])
+    rebuilt = PowerStore(df)
+
+    differences = mismatches(rebuilt.daily_cumulative, store.daily_cumulative)
+    for tier, table in rebuilt.pyramid.items():
+        grown = store.pyramid[tier]
+        if not table.index.equals(grown.index) or mismatches(table, grown):
+            differences.append(f"pyramid[{tier}]")
+    if not np.array_equal(rebuilt.day_offsets, store.day_offsets) or rebuilt.first_day != store.first_day:
+        differences.append("day_offsets")
+    if not rebuilt.frame.index.equals(store.frame.index) or mismatches(rebuilt.frame, store.frame):
+        differences.append("frame")
+    return differences
+
+# Function to run both checks on a synthetic data set with some blank values and return their mismatches
+def run(years, seed = 0):
+    df = compact_frame(synthetic_power_data(years))
+    rng = np.random.default_rng(seed)
+    for row, variable in zip(rng.integers(0, len(df), BLANK_ROWS), rng.choice(VARIABLES, BLANK_ROWS)):
+        df.loc[row, variable] = np.nan
+    return dict(kernel = check_kernel(df), append = check_append(df))
+
+if __name__ == "__main__":
+    years_list = [int(arg) for arg in sys.argv[1:]] or [1, 3]
+    failed = False
+    for years in years_list:
+        for check, differences in run(years).items():
+            print(f"{years:>3} years  {check:<7} {'FAILED: ' + ', '.join(differences) if differences else 'ok'}")
+            failed = failed or bool(differences)
+    sys.exit(1 if failed else 0)
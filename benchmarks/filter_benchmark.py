@@ -0,0 +1,58 @@
+# Micro-benchmark comparing the per-rerun cost of selecting a day or date range with df.query
+# against the sorted (Day, Hours) offsets of the PowerStore, for datasets of increasing length
+#
+# Usage: python benchmarks/filter_benchmark.py [years ...]
+
+# Importing the necessary libraries
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from power_data import PowerStore
+from synthetic import synthetic_power_data
+
+REPEATS = 200 # Number of timed selections per measurement
+
+# Function to time a selection callable and return the mean cost in microseconds
+def time_selection(select):
+    return timeit.timeit(select, number = REPEATS) / REPEATS * 1e6
+
+# Function to run the benchmark for one dataset length and return its measurements
+def run(years):
+    df = synthetic_power_data(years)
+    store = PowerStore(df)
+    slct = len(store.day_offsets) // 2
+    start_slct, end_slct = slct, slct + 30
+
+    # Selections as they were done before the index: a parsed expression and a full boolean scan
+    def query_day():
+        return df.query("Day == @slct", local_dict = dict(slct = slct))
+
+    def query_range():
+        return df.query("Day >= @start_slct and Day <= @end_slct", local_dict = dict(start_slct = start_slct, end_slct = end_slct))
+
+    # Selections through the precomputed day offsets: two lookups and a slice view
+    def offset_day():
+        start, stop = store.row_range(slct, slct)
+        return store.frame.iloc[start:stop]
+
+    def offset_range():
+        start, stop = store.row_range(start_slct, end_slct)
+        return store.frame.iloc[start:stop]
+
+    return dict(
+        years = years,
+        rows = len(df),
+        query_day = time_selection(query_day),
+        query_range = time_selection(query_range),
+        offset_day = time_selection(offset_day),
+        offset_range = time_selection(offset_range)
+    )
+
+if __name__ == "__main__":
+    years_list = [int(arg) for arg in sys.argv[1:]] or [1, 10, 50]
+    print(f"{'years':>6} {'rows':>10} {'query day':>12} {'query range':>12} {'offset day':>12} {'offset range':>13}  (us per selection)")
+    for years in years_list:
+        result = run(years)
+        print(f"{result['years']:>6} {result['rows']:>10} {result['query_day']:>12.1f} {result['query_range']:>12.1f} {result['offset_day']:>12.1f} {result['offset_range']:>13.1f}")
@@ -0,0 +1,264 @@
+# Benchmark suite for the dashboard: cold load, per-interaction latency of the tabs at several range widths,
+# site comparisons, peak memory and chart payload size, on synthetic data sets of several lengths and site counts
+# Results are written as JSON records so the runs of two commits can be compared with benchmarks/compare.py
+#
+# Usage: python benchmarks/suite.py [--years 1 10 50] [--sites 1 4] [--excel-years 1] [--repeats 5] [--output FILE]
+
+# Importing the necessary libraries
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import plotly
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from power_data import (CACHE_DIR, DATA_SHEET, PowerStore, compact_frame, derive_structures, load_power_data, read_columnar_cache, read_derived_cache,
+                        write_columnar_cache, write_derived_cache)
+from charts import CUSTOM_DATE_GRAPHS, DAILY_GRAPHS, GRAPH_VARIABLES, custom_date_chart, daily_chart, kpi_chart
+from kpis import KPIS, kpi_totals
+from profiling import start_rerun
+from queries import daily_series, energy_summary
+from sites import compare_sites, site_pool
+from synthetic import SYNTHETIC_COLUMNS, synthetic_power_data, write_synthetic_workbook
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(CACHE_DIR, "benchmarks")
+RESULTS_FORMAT = 1 # Bumped whenever the layout of the results file changes
+
+DEFAULT_YEARS = [1, 10, 50]
+DEFAULT_SITES = [1, 4]
+DEFAULT_EXCEL_YEARS = [1] # Workbooks are slow to write and parse, so only these lengths time the Excel cold load
+REPEATS = 5 # Timed runs per interaction, the median is reported
+
+DAILY_HOUR_RANGES = [None, (6, 18)] # Hour ranges of the Daily Representation interactions (None is the whole day)
+RANGE_WIDTHS = [7, 30, 365, 3650, 18250] # Day counts of the Custom Date Range interactions, capped to the data length
+
+# Function to return the commit the benchmark runs on, or None outside a git checkout
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd = REPO_DIR, capture_output = True, text = True, check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Function to time a callable, returning the median seconds of its runs, the mean seconds of each profiled stage
+# and the value of its last run
+def measure(func, repeats = REPEATS):
+    profile = start_rerun("benchmark")
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        value = func()
+        timings.append(time.perf_counter() - started)
+    stages = {name: seconds / repeats for name, seconds in profile.stages.items()}
+    return statistics.median(timings), stages, value
+
+# Function to return the peak traced memory in bytes allocated while running a callable, and its value
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        value = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, value
+
+# Function to run the work of one Daily Representation interaction, with every data type selected, and return its graphs
+def daily_interaction(store, slct, hour_range):
+    min_hour, max_hour = hour_range if hour_range else (None, None)
+    df_selection = daily_series(store, slct)
+    if min_hour is None:
+        min_hour, max_hour = int(df_selection["Hours"].min()), int(df_selection["Hours"].max())
+    energy_summary(store, slct, slct, min_hour, max_hour)
+    return [daily_chart(store, slct, min_hour, max_hour, variables, *DAILY_GRAPHS[graph]) for graph, variables in GRAPH_VARIABLES.items()]
+
+# Function to run the work of one Custom Date Range Representation interaction, with every data type selected, and return its graphs
+def custom_interaction(store, start_slct, end_slct):
+    energy_summary(store, start_slct, end_slct)
+    return [custom_date_chart(store, start_slct, end_slct, variables, *CUSTOM_DATE_GRAPHS[graph], 'Min/Max', True) for graph, variables in GRAPH_VARIABLES.items()]
+
+# Function to run the work of one Key Performance Indicators interaction, with the first KPI graphed, and return its graph
+def kpi_interaction(store, start_slct, end_slct):
+    kpi_totals(store, start_slct, end_slct)
+    return [kpi_chart(store, start_slct, end_slct, next(iter(KPIS)), None, 'Min/Max', True)]
+
+# Class collecting the result records of a run
+class Results:
+    def __init__(self):
+        self.records = []
+
+    # Method to add one measurement of a scenario
+    def add(self, scenario, metric, case, value, unit):
+        self.records.append(dict(scenario, metric = metric, case = case, value = value, unit = unit))
+
+    # Method to add the time of an interaction together with its profiled stages and the size of its graphs
+    def add_interaction(self, scenario, metric, case, seconds, stages, figs):
+        self.add(scenario, f"{metric}.latency", case, seconds, "s")
+        for name, stage_seconds in stages.items():
+            self.add(scenario, f"{metric}.stage.{name}", case, stage_seconds, "s")
+        self.add(scenario, f"{metric}.payload", case, sum(len(fig.to_json()) for fig in figs), "bytes")
+
+# Function to time the interactions of the Daily, Custom Date Range and Key Performance Indicators tabs on a store
+def bench_interactions(results, scenario, store, repeats):
+    days = store.daily.index
+    first_day, last_day = int(days[0]), int(days[-1])
+    middle_day = int(days[len(days) // 2])
+
+    for hour_range in DAILY_HOUR_RANGES:
+        case = "whole day" if hour_range is None else f"hours {hour_range[0]}-{hour_range[1]}"
+        seconds, stages, figs = measure(lambda: daily_interaction(store, middle_day, hour_range), repeats)
+        results.add_interaction(scenario, "daily", case, seconds, stages, figs)
+
+    for width in sorted({min(width, last_day - first_day + 1) for width in RANGE_WIDTHS}):
+        start_slct = max(first_day, min(middle_day, last_day - width + 1))
+        seconds, stages, figs = measure(lambda: custom_interaction(store, start_slct, start_slct + width - 1), repeats)
+        results.add_interaction(scenario, "custom_date", f"{width} days", seconds, stages, figs)
+        seconds, stages, figs = measure(lambda: kpi_interaction(store, start_slct, start_slct + width - 1), repeats)
+        results.add_interaction(scenario, "kpis", f"{width} days", seconds, stages, figs)
+
+# Function to time the Site Comparison of every site over the whole data against the comparison of each site alone,
+# the computation of the sites being concurrent so all of them should take about as long as the slowest one
+def bench_comparison(results, scenario, stores, repeats):
+    if len(stores) < 2:
+        return
+    first_date, last_date = next(iter(stores.values())).date_bounds()
+    with site_pool() as pool:
+        for site, store in stores.items():
+            seconds, _, _ = measure(lambda: compare_sites({site: store}, first_date, last_date, pool), repeats)
+            results.add(scenario, "compare.latency", site, seconds, "s")
+        seconds, _, _ = measure(lambda: compare_sites(stores, first_date, last_date, pool), repeats)
+        results.add(scenario, "compare.latency", "all sites", seconds, "s")
+
+# Function to benchmark the in-memory backend, loading one store per site from its columnar cache
+def bench_memory_backend(results, scenario, frames, work_dir, repeats):
+    directories = []
+    for site, df in enumerate(frames):
+        directory = os.path.join(work_dir, f"columnar_{site}")
+        started = time.perf_counter()
+        manifest = write_columnar_cache(df, directory, dict(site = site))
+        results.add(scenario, "cold_load.cache_write", f"site {site}", time.perf_counter() - started, "s")
+        directories.append((directory, manifest))
+
+    # Loading every site as a fresh server process would, from the memory-mapped cache to the built stores
+    def load_stores():
+        return [PowerStore(read_columnar_cache(directory, manifest)) for directory, manifest in directories]
+
+    started = time.perf_counter()
+    stores = load_stores()
+    results.add(scenario, "cold_load.stores", "all sites", time.perf_counter() - started, "s")
+    del stores
+    peak, stores = peak_memory(load_stores)
+    results.add(scenario, "memory.stores_peak", "all sites", peak, "bytes")
+    results.add(scenario, "memory.hourly_columns", "all sites", int(sum(df.memory_usage(index = False).sum() for df in frames)), "bytes")
+
+    # Attaching every site as a further server process would, to derived structures another process already wrote
+    derived = []
+    for site, (directory, manifest) in enumerate(directories):
+        derived_directory = os.path.join(directory, "derived")
+        derived.append((directory, manifest, derived_directory, write_derived_cache(derive_structures(stores[site].frame), derived_directory, dict(site = site))))
+
+    def attach_stores():
+        return [PowerStore(read_columnar_cache(directory, manifest), derived = read_derived_cache(derived_directory, derived_manifest))
+                for directory, manifest, derived_directory, derived_manifest in derived]
+
+    started = time.perf_counter()
+    attach_stores()
+    results.add(scenario, "cold_load.attach", "all sites", time.perf_counter() - started, "s")
+    peak, _ = peak_memory(attach_stores)
+    results.add(scenario, "memory.attach_peak", "all sites", peak, "bytes")
+
+    bench_interactions(results, scenario, stores[0], repeats)
+    bench_comparison(results, scenario, {f"site {site}": store for site, store in enumerate(stores)}, repeats)
+
+# Function to benchmark the out-of-core backend over a dataset holding every site
+def bench_partitioned_backend(results, scenario, frames, work_dir, repeats):
+    try:
+        from partitioned_store import PartitionedStore, write_partitioned # Imported here so pyarrow is only needed by this backend
+    except ImportError as error:
+        print(f"Skipping the partitioned backend: {error}", file = sys.stderr)
+        return
+
+    root = os.path.join(work_dir, "dataset")
+    started = time.perf_counter()
+    for site, df in enumerate(frames):
+        write_partitioned(df, root, f"site{site}")
+    results.add(scenario, "cold_load.dataset_write", "all sites", time.perf_counter() - started, "s")
+
+    started = time.perf_counter()
+    PartitionedStore(root, "site0")
+    results.add(scenario, "cold_load.stores", "one site", time.perf_counter() - started, "s")
+    peak, store = peak_memory(lambda: PartitionedStore(root, "site0"))
+    results.add(scenario, "memory.stores_peak", "one site", peak, "bytes")
+
+    bench_interactions(results, scenario, store, repeats)
+    bench_comparison(results, scenario, {f"site {site}": PartitionedStore(root, f"site{site}") for site in range(len(frames))}, repeats)
+
+# Function to time the first load of a workbook, parsing it and writing its columnar cache
+def bench_excel_load(results, scenario, df, work_dir):
+    path = write_synthetic_workbook(df, os.path.join(work_dir, "synthetic.xlsx"))
+    started = time.perf_counter()
+    load_power_data(path, DATA_SHEET, SYNTHETIC_COLUMNS, None, cache_dir = os.path.join(work_dir, "excel_cache"))
+    results.add(scenario, "cold_load.excel", "site 0", time.perf_counter() - started, "s")
+
+# Function to run every scenario and return the results document
+def run(years_list, sites_list, excel_years, repeats, backends):
+    results = Results()
+    for years in years_list:
+        for sites in sites_list:
+            frames = [compact_frame(synthetic_power_data(years, site = site)) for site in range(sites)] # In the column types the loader stores
+            with tempfile.TemporaryDirectory() as work_dir:
+                for backend in backends:
+                    scenario = dict(years = years, sites = sites, backend = backend)
+                    print(f"Running {years} years x {sites} sites on the {backend} backend", file = sys.stderr)
+                    if backend == "memory":
+                        bench_memory_backend(results, scenario, frames, work_dir, repeats)
+                        if years in excel_years and sites == min(sites_list):
+                            bench_excel_load(results, scenario, frames[0], work_dir)
+                    else:
+                        bench_partitioned_backend(results, scenario, frames, work_dir, repeats)
+
+    return dict(
+        format = RESULTS_FORMAT,
+        commit = git_commit(),
+        time = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec = "seconds"),
+        environment = dict(
+            python = platform.python_version(),
+            platform = platform.platform(),
+            numpy = np.__version__,
+            pandas = pd.__version__,
+            plotly = plotly.__version__
+        ),
+        settings = dict(years = years_list, sites = sites_list, excel_years = excel_years, repeats = repeats),
+        results = results.records
+    )
+
+# Function to write a results document, by default as .cache/benchmarks/<time>-<commit>.json
+def write_results(document, path = None):
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok = True)
+        stamp = document["time"].replace(":", "").replace("-", "")[:15]
+        path = os.path.join(RESULTS_DIR, f"{stamp}-{(document['commit'] or 'nogit')[:10]}.json")
+    with open(path, "w") as handle:
+        json.dump(document, handle, indent = 1)
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Benchmark the dashboard on synthetic data")
+    parser.add_argument("--years", type = int, nargs = "+", default = DEFAULT_YEARS, help = "lengths of the synthetic data sets in years")
+    parser.add_argument("--sites", type = int, nargs = "+", default = DEFAULT_SITES, help = "numbers of sites of the synthetic data sets")
+    parser.add_argument("--excel-years", type = int, nargs = "*", default = DEFAULT_EXCEL_YEARS, help = "lengths for which the Excel cold load is timed")
+    parser.add_argument("--repeats", type = int, default = REPEATS, help = "timed runs per interaction")
+    parser.add_argument("--backends", nargs = "+", choices = ["memory", "partitioned"], default = ["memory", "partitioned"])
+    parser.add_argument("--output", help = "results file (default: a new file in .cache/benchmarks)")
+    args = parser.parse_args()
+
+    document = run(args.years, args.sites, args.excel_years, args.repeats, args.backends)
+    print(write_results(document, args.output))
@@ -0,0 +1,50 @@
+# Generator of synthetic hourly power data shaped like the dashboard's workbook, for benchmarking data sets of any
+# length and any number of sites without the real data
+
+# Importing the necessary libraries
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from power_data import DATA_SHEET, VARIABLES
+
+SYNTHETIC_COLUMNS = 'B:K' # Columns of the Day, Hours and power columns in a synthetic workbook
+
+# Function to generate a synthetic hourly power dataset covering the given number of years
+# Every site gets its own seed and plant size; Generation and Load are the sums of their parts as in the workbook
+def synthetic_power_data(years, seed = 0, site = 0):
+    rng = np.random.default_rng([seed, site])
+    days = years * 365
+    rows = days * 24
+    hours = np.tile(np.arange(24), days)
+    scale = 1 + 0.25 * site
+
+    # Shaping PV as a daylight bell with cloudy days, Wind as a smoothly varying random walk and the loads around a base level
+    daylight = np.clip(np.sin((hours - 6) / 12 * np.pi), 0, None)
+    pv = scale * 50 * daylight * np.repeat(rng.uniform(0.3, 1, days), 24)
+    wind = scale * 30 * np.abs(np.sin(np.cumsum(rng.normal(0, 0.05, rows))))
+    plant = scale * (20 + rng.normal(0, 2, rows))
+    electrolyzer = scale * 40 * rng.uniform(0.2, 1, rows)
+    bess = -np.clip(pv + wind - plant - electrolyzer, -scale * 15, scale * 15) # Charging (negative) on surplus, discharging on deficit
+    grid = plant + electrolyzer - pv - wind - bess
+
+    data = {
+        "Day": np.repeat(np.arange(1, days + 1), 24),
+        "Hours": hours,
+        "PV": pv,
+        "Wind": wind,
+        "Grid": grid,
+        "BESS": bess,
+        "Plant": plant,
+        "Electrolyzer": electrolyzer
+    }
+    data["Generation"] = pv + wind + grid + bess
+    data["Load"] = plant + electrolyzer
+    return pd.DataFrame(data, columns = ["Day", "Hours"] + VARIABLES)
+
+# Function to write a synthetic dataset as a workbook laid out like the real one, with the data starting in column B
+def write_synthetic_workbook(df, path, sheet_name = DATA_SHEET):
+    df.to_excel(path, sheet_name = sheet_name, index = False, startcol = 1, engine = 'openpyxl')
+    return path
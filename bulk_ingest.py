@@ -0,0 +1,149 @@
+# Bulk ingestion of an archive split across many workbooks (for example one per year) and sheets: the sources are parsed
+# in parallel by a process pool, checked against the column schema and merged into one columnar cache, from which a
+# PowerStore is built the same way as from a single workbook. Every source keeps its own columnar cache, so a re-ingest
+# only parses the workbooks that changed
+#
+# Usage: python bulk_ingest.py <workbook glob> [<workbook glob> ...] [--sheets Sheet3 ...] [--usecols B:L] [--workers N]
+#        (--sheets "*" reads every sheet of every workbook)
+
+# Importing the necessary libraries
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from power_data import (CACHE_DIR, CACHE_FORMAT, DATA_COLUMNS, DATA_SHEET, DATA_START_DATE, REQUIRED_COLUMNS, attach_power_store,
+                        cache_path, compact_frame, load_power_data, read_columnar_cache, read_manifest, write_columnar_cache)
+
+ALL_SHEETS = "*" # Sheet name standing for every sheet of a workbook
+
+# Function to return the (workbook, sheet) pairs matched by glob patterns, in a stable order
+def expand_sources(patterns, sheet_names = (DATA_SHEET,)):
+    paths = sorted({os.path.abspath(path) for pattern in patterns for path in glob.glob(pattern, recursive = True)})
+    if not paths:
+        raise ValueError(f"No workbooks match {', '.join(patterns)}")
+    sources = []
+    for path in paths:
+        if ALL_SHEETS in sheet_names:
+            import openpyxl # Only needed to list the sheets of a workbook
+            workbook = openpyxl.load_workbook(path, read_only = True)
+            sources += [(path, sheet_name) for sheet_name in workbook.sheetnames]
+            workbook.close()
+        else:
+            sources += [(path, sheet_name) for sheet_name in sheet_names]
+    return sources
+
+# Function to return the cache directory of a merged archive, named after its patterns, sheets and columns
+def archive_path(patterns, sheet_names, usecols = DATA_COLUMNS, cache_dir = CACHE_DIR):
+    name = hashlib.sha256(json.dumps([sorted(patterns), sorted(sheet_names), usecols]).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"archive_{name}")
+
+# Function to return the cache directory of one source of an archive, unique per workbook path so that workbooks with
+# the same name in different folders (such as one per site) never share a cache
+def source_cache_dir(directory, path):
+    return os.path.join(directory, "sources", hashlib.sha256(path.encode()).hexdigest()[:16])
+
+# Function to describe the current state of the source files, which a merged cache is only valid for
+def source_fingerprints(sources):
+    fingerprints = []
+    for path, sheet_name in sources:
+        stat = os.stat(path)
+        fingerprints.append([path, sheet_name, stat.st_mtime_ns, stat.st_size])
+    return fingerprints
+
+# Function run in a worker process to read one sheet (from its own columnar cache when the workbook is unchanged, its
+# schema having been checked by load_power_data when the cache was built) and return its hourly rows with the required columns only (in the compact column types), its name
+# and the hash of its workbook
+def read_source(path, sheet_name, usecols, cache_dir):
+    df = load_power_data(path, sheet_name, usecols, None, cache_dir)
+    sha256 = read_manifest(cache_path(path, sheet_name, cache_dir))["sha256"]
+    source = f"{os.path.basename(path)} [{sheet_name}]"
+    df = df[REQUIRED_COLUMNS] # Blank rows of the sheet were already dropped by load_power_data
+    for column in ["Day", "Hours"]:
+        values = df[column].to_numpy()
+        if not np.all(values == np.round(values)):
+            raise ValueError(f"{source} has fractional values in the {column} column")
+    return compact_frame(df), source, sha256
+
+# Function to merge the rows of every source into one frame sorted by Day and Hours, raising ValueError when two
+# sources hold the same hour
+def merge_sources(frames, sources):
+    df = pd.concat(frames, ignore_index = True)
+    owners = np.repeat(np.arange(len(frames)), [len(frame) for frame in frames])
+    order = np.lexsort((df["Hours"].to_numpy(), df["Day"].to_numpy()))
+    df = df.iloc[order].reset_index(drop = True)
+    owners = owners[order]
+
+    days, hours = df["Day"].to_numpy(), df["Hours"].to_numpy()
+    duplicates = np.flatnonzero((days[1:] == days[:-1]) & (hours[1:] == hours[:-1]))
+    if len(duplicates):
+        first = duplicates[0]
+        raise ValueError(
+            f"{len(duplicates)} hours appear in more than one source, first Day {days[first]} hour {hours[first]} "
+            f"in {sources[owners[first]]} and {sources[owners[first + 1]]}"
+        )
+    return df
+
+# Function to ingest the workbooks matched by glob patterns into one columnar cache and return it as a DataFrame
+# of read-only memory maps. Sheets are parsed by a pool of worker processes (one per core by default, workers = 1
+# parses them in this process); nothing is parsed when no source changed since the last ingest
+def ingest_workbooks(patterns, sheet_names = (DATA_SHEET,), usecols = DATA_COLUMNS, cache_dir = CACHE_DIR, workers = None):
+    sources = expand_sources(patterns, sheet_names)
+    directory = archive_path(patterns, sheet_names, usecols, cache_dir)
+    fingerprints = source_fingerprints(sources)
+    manifest = read_manifest(directory)
+    if manifest is not None and manifest.get("format") == CACHE_FORMAT and manifest.get("sources") == fingerprints:
+        return read_columnar_cache(directory, manifest)
+
+    arguments = [(path, sheet_name, usecols, source_cache_dir(directory, path)) for path, sheet_name in sources]
+    if workers == 1:
+        results = [read_source(*argument) for argument in arguments]
+    else:
+        # Spawned workers only import this module and power_data, never the script that started the ingest
+        with ProcessPoolExecutor(max_workers = workers, mp_context = multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(read_source, *zip(*arguments)))
+    frames, names, hashes = zip(*results)
+    df = merge_sources(list(frames), list(names))
+
+    # Identifying the merged data by the contents of its sources, so the derived structures are only rebuilt when they change
+    digest = hashlib.sha256()
+    for (path, sheet_name), sha256 in zip(sources, hashes):
+        digest.update(f"{path}:{sheet_name}:{sha256}".encode())
+    manifest = write_columnar_cache(df, directory, dict(sources = fingerprints, sha256 = digest.hexdigest()))
+    return read_columnar_cache(directory, manifest)
+
+# Function to ingest an archive and return it as a PowerStore sharing its hourly columns and derived structures
+# with every other process that loads the same archive
+def load_archive_store(patterns, sheet_names = (DATA_SHEET,), usecols = DATA_COLUMNS, cache_dir = CACHE_DIR, workers = None,
+                       start_date = DATA_START_DATE):
+    df = ingest_workbooks(patterns, sheet_names, usecols, cache_dir, workers)
+    directory = archive_path(patterns, sheet_names, usecols, cache_dir)
+    return attach_power_store(df, directory, read_manifest(directory)["sha256"], start_date)
+
+# Function to ingest an archive in a separate interpreter running this module, so the process pool is never started
+# from a Streamlit script (whose spawned workers would re-run the script)
+def prepare_archive_store(patterns, sheet_names = (DATA_SHEET,), usecols = DATA_COLUMNS):
+    command = [sys.executable, os.path.abspath(__file__), *patterns, "--sheets", *sheet_names, "--usecols", usecols]
+    result = subprocess.run(command, capture_output = True, text = True)
+    if result.returncode != 0:
+        message = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit code {result.returncode}"
+        raise RuntimeError(f"Ingesting the archive failed: {message}")
+
+# Ingesting an archive from the command line
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Ingest workbooks into the dashboard's columnar store")
+    parser.add_argument("patterns", nargs = "+", help = "glob patterns of the workbooks (** matches folders recursively)")
+    parser.add_argument("--sheets", nargs = "+", default = [DATA_SHEET], help = f'sheets to read from every workbook, "{ALL_SHEETS}" for all of them')
+    parser.add_argument("--usecols", default = DATA_COLUMNS, help = "columns of the sheets holding the data")
+    parser.add_argument("--workers", type = int, default = None, help = "worker processes (default: one per core)")
+    args = parser.parse_args()
+
+    store = load_archive_store(args.patterns, args.sheets, args.usecols, workers = args.workers)
+    first_date, last_date = store.date_bounds()
+    print(f"Ingested {len(store.frame)} hourly rows from {first_date} to {last_date} into {archive_path(args.patterns, args.sheets, args.usecols)}")
@@ -0,0 +1,214 @@
+# Builders of the dashboard's graphs, kept free of Streamlit so they can also be timed outside the application
+# (see benchmarks/suite.py)
+
+# Importing the necessary libraries
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from downsampling import WEBGL_THRESHOLD, downsample, point_budget, thin_ticks
+from figure_cache import cached_chart
+from kpis import KPIS, kpi_series
+from profiling import stage
+from queries import daily_series, day_timestamps, range_series
+
+# Axis titles of the resolution tiers the Custom Date Range graphs can be drawn from
+TIER_TITLES = {'hour': "Hours", 'day': "Days", 'week': "Weeks", 'month': "Months", 'year': "Years"}
+
+# Data types offered for each of the three graphs of both tabs
+GRAPH_VARIABLES = {
+    "generation": ['PV', 'Wind', 'Grid', 'BESS'],
+    "load": ['Plant', 'Electrolyzer'],
+    "parallel": ['Generation', 'Load']
+}
+
+# Line colors and titles of the graphs of the Daily Representation tab
+DAILY_GRAPHS = {
+    "generation": (["#0083B8","#5F94AE","#FFB752","#F9584B"], "<b>Generation Graph</b>"),
+    "load": (["#8B7335","#FFD12B"], "<b>Load Graph</b>"),
+    "parallel": (["#F4D03F","#E74C3C"], "<b>Total Generation & Total Load Graph</b>")
+}
+
+# Color shifts and titles of the graphs of the Custom Date Range Representation tab
+CUSTOM_DATE_GRAPHS = {
+    "generation": (0, "<b>Generation Graph</b>"),
+    "load": (0, "<b>Load Graph</b>"),
+    "parallel": (4, "<b>Total Generation & Total Load Graph</b>")
+}
+
+# Function to build a graph of the Daily Representation tab (the energies shown with it come from energy_summary)
+def daily_chart(store, slct, min_hour, max_hour, y_variables, colors, title):
+    df_filtered = daily_series(store, slct, min_hour, max_hour) # Getting the rows of the selected day and hour range
+    
+    with stage("figure"):
+        # Creating the graph for the selected data types
+        fig = px.line(
+            df_filtered,
+            x = "Hours",
+            y = y_variables,
+            markers = True,
+            color_discrete_sequence = colors,
+            template = "plotly_white"
+        )
+        
+        # Updating the layout of the graph
+        fig.update_layout(
+            title = dict(text = title, font_size = 24),
+            xaxis = dict(tickmode = "linear"),
+            plot_bgcolor = "rgba(0,0,0,0)",
+            yaxis = (dict(title = "Value (MW)", showgrid = False))
+        )
+    return fig
+
+# List of colors to be used for different lines in the graphs of the Custom Date Range Representation tab
+RANGE_COLORS = ["#A93226","#6C3483","#0E6655","#F1C40F","#D35400","#616A6B","#2C3E50","#2ECC71"]
+
+# Function to return the trace type of a graph from the points its downsampled traces actually send to the browser,
+# WebGL (when allowed) once any trace has more than WEBGL_THRESHOLD points
+def webgl_trace_type(traces, use_webgl):
+    points = max([len(trace[0]) for trace in traces], default = 0)
+    return go.Scattergl if use_webgl and points > WEBGL_THRESHOLD else go.Scatter
+
+# Function to build a graph of the Custom Date Range Representation tab
+def custom_date_chart(store, start_slct, end_slct, y_variables, color_shift, title, downsampling_method, use_webgl):
+    # Picking the coarsest resolution tier that still gives enough points and slicing it based on the selected date range
+    tier, tier_selection = range_series(store, start_slct, end_slct)
+    
+    with stage("figure"):
+        tick_values = thin_ticks(np.arange(start_slct, end_slct + 1)) # Keeping only as many day ticks as can be labelled legibly
+    
+        # Converting the tick day numbers to actual dates for x-axis ticks
+        x_ticks = pd.DatetimeIndex(store.day_dates(tick_values)).strftime('%d/%m/%y').tolist() # Creating custom x-axis ticks with formatted dates in 'DD/MM/YY' format
+    
+        # Downsampling the series to the pixel width of the graphs
+        budget = point_budget()
+        traces = [] # x and y values, line and name of every trace
+    
+        for i, y_variable in enumerate(y_variables): # Iterating through the selected data types
+    
+            if tier == 'hour':
+                # Hourly rows have a single value per hour, so they are drawn as one trace rather than equal Max and Min traces
+                x, y = downsample(tier_selection.index, tier_selection[f"{y_variable}_mean"], downsampling_method, budget)
+                traces.append((x, y, dict(color = RANGE_COLORS[(i + color_shift) % len(RANGE_COLORS)]), y_variable))
+                continue
+    
+            # Downsampling the maximum and minimum values for the current data type
+            x_max, y_max = downsample(tier_selection.index, tier_selection[f"{y_variable}_max"], downsampling_method, budget)
+            x_min, y_min = downsample(tier_selection.index, tier_selection[f"{y_variable}_min"], downsampling_method, budget)
+        
+            # Adding a trace for the maximum values and one for the minimum values with a dashed line
+            traces.append((x_max, y_max, dict(color = RANGE_COLORS[(i + color_shift) % len(RANGE_COLORS)]), f"{y_variable} (Max)"))
+            traces.append((x_min, y_min, dict(color = RANGE_COLORS[(i + color_shift + 2) % len(RANGE_COLORS)], dash = "dash"), f"{y_variable} (Min)"))
+    
+        # Creating the graph for the selected data types, switching to WebGL if the downsampled traces stay large
+        trace_type = webgl_trace_type(traces, use_webgl)
+        fig = go.Figure([trace_type(x = x, y = y, mode = 'lines+markers', line = line, name = name) for x, y, line, name in traces])
+    
+        # Updating the layout of the graph
+        fig.update_layout(
+            title = dict(text = title, font_size = 24),
+            xaxis = dict(title = TIER_TITLES[tier], tickmode = "array", ticktext = x_ticks, tickvals = tick_values.tolist()),
+            yaxis = dict(title = "Value (MW)", showgrid = False),
+            template = "plotly_white",
+            showlegend = True
+        )
+    return fig
+
+# Function to get a graph of the Daily Representation tab from the figure cache, building it on a miss.
+# The key is the normalized selection, so sessions (and the warm-up presets) making the same selection share the entry
+def cached_daily_chart(figure_cache, store, graph, slct, min_hour, max_hour, y_variables):
+    colors, title = DAILY_GRAPHS[graph]
+    return cached_chart(
+        figure_cache,
+        ("daily", slct, min_hour, max_hour, store.version, graph, tuple(y_variables)),
+        lambda: daily_chart(store, slct, min_hour, max_hour, y_variables, colors, title)
+    )
+
+# Function to get a graph of the Custom Date Range Representation tab from the figure cache, building it on a miss
+def cached_custom_date_chart(figure_cache, store, graph, start_slct, end_slct, y_variables, downsampling_method, use_webgl):
+    color_shift, title = CUSTOM_DATE_GRAPHS[graph]
+    return cached_chart(
+        figure_cache,
+        ("custom_date", start_slct, end_slct, downsampling_method, use_webgl, store.version, graph, tuple(y_variables)),
+        lambda: custom_date_chart(store, start_slct, end_slct, y_variables, color_shift, title, downsampling_method, use_webgl)
+    )
+
+# Function to build the graph of the Site Comparison tab, overlaying the highest and lowest values of a data type
+# over the selected dates for every compared site, on a shared date axis
+def site_comparison_chart(comparisons, variable, downsampling_method, use_webgl):
+    with stage("figure"):
+        budget = point_budget()
+        traces = [] # x and y values, line and name of every trace
+        
+        for i, comparison in enumerate(comparisons.values()): # Iterating through the compared sites
+            series = comparison.series
+            color = RANGE_COLORS[i % len(RANGE_COLORS)]
+            
+            # Downsampling the maximum and minimum values of the site on its Day numbers, then placing them on dates.
+            # Hourly rows have a single value per hour, so they are drawn as one trace rather than equal Max and Min traces
+            if comparison.tier == 'hour':
+                site_traces = [("mean", None, comparison.site)]
+            else:
+                site_traces = [("max", None, f"{comparison.site} (Max)"), ("min", "dash", f"{comparison.site} (Min)")]
+            for statistic, dash, name in site_traces:
+                x, y = downsample(series.index, series[f"{variable}_{statistic}"], downsampling_method, budget)
+                traces.append((day_timestamps(comparison.store, x), y, dict(color = color, dash = dash), name))
+        
+        # Creating the graph for the compared sites, switching to WebGL if the downsampled traces stay large
+        trace_type = webgl_trace_type(traces, use_webgl)
+        fig = go.Figure([trace_type(x = x, y = y, mode = 'lines', line = line, name = name) for x, y, line, name in traces])
+        
+        # Updating the layout of the graph
+        tiers = {comparison.tier for comparison in comparisons.values()}
+        fig.update_layout(
+            title = dict(text = f"<b>{variable} by Site</b>", font_size = 24),
+            xaxis = dict(title = TIER_TITLES[tiers.pop()] if len(tiers) == 1 else "Date"),
+            yaxis = dict(title = "Value (MW)", showgrid = False),
+            template = "plotly_white",
+            showlegend = True
+        )
+    return fig
+
+# Function to get the graph of the Site Comparison tab from the figure cache, building it on a miss. The key holds
+# the data version of every compared site, so appending rows to any of them builds the graph again
+def cached_site_comparison_chart(figure_cache, comparisons, start_date, end_date, variable, downsampling_method, use_webgl):
+    sites = tuple((site, str(comparison.store.version)) for site, comparison in comparisons.items())
+    return cached_chart(
+        figure_cache,
+        ("sites", sites, start_date, end_date, downsampling_method, use_webgl, variable),
+        lambda: site_comparison_chart(comparisons, variable, downsampling_method, use_webgl)
+    )
+
+# Function to build the graph of the Key Performance Indicators tab, drawing a KPI per period of the resolution tier
+# picked for the selected dates, from the daily cumulative sums of the data store
+def kpi_chart(store, start_slct, end_slct, kpi, ratings, downsampling_method, use_webgl):
+    tier, series = kpi_series(store, start_slct, end_slct, ratings)
+    
+    with stage("figure"):
+        # Downsampling the KPI on its Day numbers, then placing it on dates, in WebGL if it stays large
+        x, y = downsample(series.index, series[kpi], downsampling_method, point_budget())
+        trace_type = webgl_trace_type([(x, y)], use_webgl)
+        fig = go.Figure(trace_type(
+            x = day_timestamps(store, x),
+            y = y,
+            mode = 'lines',
+            line = dict(color = RANGE_COLORS[list(KPIS).index(kpi) % len(RANGE_COLORS)]),
+            name = kpi)
+        )
+        
+        # Updating the layout of the graph
+        fig.update_layout(
+            title = dict(text = f"<b>{kpi} per {TIER_TITLES[tier][:-1]}</b>", font_size = 24),
+            xaxis = dict(title = TIER_TITLES[tier]),
+            yaxis = dict(title = f"{kpi} ({KPIS[kpi][0]})", showgrid = False),
+            template = "plotly_white"
+        )
+    return fig
+
+# Function to get the graph of the Key Performance Indicators tab from the figure cache, building it on a miss
+def cached_kpi_chart(figure_cache, store, start_slct, end_slct, kpi, ratings, downsampling_method, use_webgl):
+    return cached_chart(
+        figure_cache,
+        ("kpis", start_slct, end_slct, downsampling_method, use_webgl, store.version, kpi, tuple(sorted(ratings.items()))),
+        lambda: kpi_chart(store, start_slct, end_slct, kpi, ratings, downsampling_method, use_webgl)
+    )
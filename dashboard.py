@@ -1,10 +1,20 @@
 # Importing the necessary libraries
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import streamlit as sr
 import datetime
-from datetime import timedelta
+from power_data import load_power_store
+from warmup import WarmUp, prepare_power_store
+from bulk_ingest import load_archive_store, prepare_archive_store
+from downsampling import METHODS
+from charts import GRAPH_VARIABLES, cached_custom_date_chart, cached_daily_chart, cached_kpi_chart, cached_site_comparison_chart
+from power_data import VARIABLES
+from sites import compare_sites, dataset_sites, load_site_workbooks, site_pool
+from queries import daily_series, energy_summary
+from kpis import KPIS, kpi_totals
+from figure_cache import FigureCache
+from ingest import LiveStore, start_drop_watcher
+from api import API_PORT, start_query_server
+from profiling import finish_rerun, record_payload, stage, start_rerun
 
 # Setting the Streamlit page configuration with title, icon and layout
 sr.set_page_config(page_title = "Dashboard",
@@ -12,18 +22,87 @@ sr.set_page_config(page_title = "Dashboard",
                    layout = "wide"
 )
 
-# Function to read power data from the Excel file and return it as a Dataframe with specific settings
-@sr.cache_data(experimental_allow_widgets = True)
+# Settings of the Excel file the power data is read from
+EXCEL_SETTINGS = dict(
+    path = 'D:/GitHub/Dashboard/2022_05_13_HourlyPowerData.xlsx',
+    sheet_name = 'Sheet3',
+    usecols = 'B:L',
+    nrows = 87649,
+    check_precision = False # Set to keep the power columns that would lose precision as float32 in float64 when the cache is built
+)
+
+# Function to read power data from the Excel file and return it as a data store with specific settings
+# The workbook is converted once into a memory-mapped columnar cache, and the daily rollup, pyramid and cumulative sums
+# derived from it are written next to it, so later loads skip the openpyxl parse and every session (and every server
+# process on the machine) reads the same pages instead of holding its own copy. A missing or stale cache is built in a
+# worker process, so the server keeps answering while it is built
 def get_data_from_excel():
-    df = pd.read_excel(
-        io = 'D:/GitHub/Dashboard/2022_05_13_HourlyPowerData.xlsx',
-        engine = 'openpyxl',
-        sheet_name = 'Sheet3',
-        skiprows = 0,
-        usecols = 'B:L',
-        nrows = 87649
-    )
-    return df
+    prepare_power_store(**EXCEL_SETTINGS)
+    store = load_power_store(**EXCEL_SETTINGS)
+    return store
+
+ARCHIVE_PATTERNS = None # Glob patterns of yearly or per-site workbooks (see bulk_ingest.py); when set they are ingested in parallel and merged instead of reading the single workbook
+ARCHIVE_SHEETS = ['Sheet3'] # Sheets read from every workbook of the archive, ['*'] for all of them
+
+# Function to ingest the workbooks of the archive with a process pool and return them merged as one data store
+# The pool runs in a separate interpreter and only the workbooks changed since the last ingest are parsed again
+def get_data_from_archive():
+    prepare_archive_store(ARCHIVE_PATTERNS, ARCHIVE_SHEETS, EXCEL_SETTINGS["usecols"])
+    store = load_archive_store(ARCHIVE_PATTERNS, ARCHIVE_SHEETS, EXCEL_SETTINGS["usecols"], workers = 1)
+    return store
+
+DATASET_DIR = None # Directory of a Parquet dataset partitioned by site and year (see partitioned_store.py); when set it is queried out of core instead of loading the workbook
+INGEST_DIR = 'D:/GitHub/Dashboard/incoming' # Directory tailed for CSV/Parquet drops of new hourly rows
+REFRESH_SECONDS = 10 # Seconds between two checks of open sessions for newly ingested rows
+QUERY_PORT = API_PORT # Local port of the headless JSON/Arrow query endpoint (see api.py), None to not serve it
+WARMING_POLL_SECONDS = 1 # Seconds between two checks of a waiting session for the end of the warm-up
+SITE_NAME = 'Main' # Name of the site of the data store above in the Site Comparison tab
+KPI_RATINGS = dict(Electrolyzer = None, BESS = None) # Rated power of the Electrolyzer (MW) and capacity of the BESS (MWh) the KPIs are relative to, None to estimate them from the data
+SITES = {} # Further sites to compare with it, by name, each with workbook settings like EXCEL_SETTINGS (with DATASET_DIR set, every other site of the dataset is compared instead)
+
+# Function to build the data store with the derived structures (such as the daily rollup), to start appending the hourly
+# rows dropped into the ingest directory to it and to serve queries on it to local tools. Run once by the warm-up thread
+def load_live_store():
+    if DATASET_DIR:
+        from partitioned_store import PartitionedStore # Imported here so pyarrow is only needed by the out-of-core backend
+        live = LiveStore(PartitionedStore(DATASET_DIR))
+    elif ARCHIVE_PATTERNS:
+        live = LiveStore(get_data_from_archive())
+    else:
+        live = LiveStore(get_data_from_excel())
+    start_drop_watcher(live, INGEST_DIR)
+    if QUERY_PORT:
+        start_query_server(live, port = QUERY_PORT, ratings = KPI_RATINGS)
+    return live
+
+# Function to start the warm-up loading the data store and building the graphs new sessions open on, once per server.
+# Sessions do not wait for it: they show a warming state until the data is loaded
+@sr.cache_resource
+def get_warm_up():
+    return WarmUp(load_live_store, get_figure_cache()).start()
+
+# Function to get the live data store, or None while the warm-up is still loading it
+def get_live_store():
+    return get_warm_up().live
+
+# Function to get the current version of the data store
+def get_data_store():
+    return get_live_store().current
+
+# Function to get the thread pool computing (and loading) the compared sites, shared by all sessions of the server
+@sr.cache_resource
+def get_site_pool():
+    return site_pool()
+
+# Function to load the data stores of the other sites once per server, all at once in the site pool,
+# when the Site Comparison tab is first opened
+@sr.cache_resource(show_spinner = "Loading the sites...")
+def get_site_stores():
+    if DATASET_DIR:
+        from partitioned_store import DEFAULT_SITE, PartitionedStore # Imported here so pyarrow is only needed by the out-of-core backend
+        sites = [site for site in dataset_sites(DATASET_DIR) if site != DEFAULT_SITE]
+        return dict(zip(sites, get_site_pool().map(lambda site: PartitionedStore(DATASET_DIR, site), sites)))
+    return load_site_workbooks(SITES, get_site_pool())
 
 # Function to format energy values into appropriate units and scientific notation if necessary
 def format_energy(value):
@@ -40,34 +119,79 @@ def format_energy(value):
         energy = f"{value:.3f} {units[idx]}"
     return energy
 
+# Labels of the energies shown under each graph: the name of its selected total (None for no total) and of each data type's energy
+ENERGY_LABELS = {
+    "generation": ("Generation", "Energy"),
+    "load": ("Load", "Energy"),
+    "parallel": (None, "Total Energy")
+}
+
+# Function to display the energies of the data types selected for a graph from the energy summary of the selection,
+# with the BESS energy split into charging and discharging
+def show_energies(summary, graph, variables):
+    total_label, label = ENERGY_LABELS[graph]
+    with stage("format"):
+        if total_label:
+            sr.markdown(f"<h5>Selected {total_label} Energy: {format_energy(summary.total(variables))}</h5>", unsafe_allow_html = True)
+        for variable, energy in summary.energies(variables).items():
+            if variable == 'BESS':
+                sr.markdown(f"**{variable} {label}**: {format_energy(energy)} ({format_energy(abs(summary.charging))} Charging, {format_energy(summary.discharging)} Discharging)")
+            else:
+                sr.markdown(f"**{variable} {label}**: {format_energy(energy)}")
+
+# Function to get the cache of figures shared by all sessions of the server
+@sr.cache_resource
+def get_figure_cache():
+    return FigureCache()
+
+# Function to display a graph, timing its serialization and recording its payload size for the profiling panel
+def show_chart(chart, fig):
+    record_payload(chart, fig)
+    with stage("render"):
+        sr.plotly_chart(fig, use_container_width = True)
+
+# Function to display the opt-in profiling panel in the sidebar with the timings of the current rerun
+def profiling_panel(profile):
+    sr.sidebar.markdown("----")
+    if not sr.sidebar.checkbox("Show profiling panel", key = "show_profile"):
+        return
+    
+    sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Profiling:</p>", unsafe_allow_html = True)
+    sr.sidebar.markdown(f"**Rerun**: {profile.seconds * 1000:.1f} ms")
+    
+    # Displaying the time spent in each stage, slowest first
+    stages = pd.DataFrame({"Stage": list(profile.stages.keys()), "ms": [seconds * 1000 for seconds in profile.stages.values()]})
+    sr.sidebar.dataframe(stages.sort_values("ms", ascending = False).round(2), hide_index = True, use_container_width = True)
+    
+    # Displaying the size of the figure sent to the browser for each graph
+    for chart, size in profile.payloads.items():
+        sr.sidebar.markdown(f"**{chart.capitalize()} Payload**: {size / 1024:.1f} KB")
+    
+    # Displaying the figure cache hits of this rerun and of the whole server process
+    cache_stats = get_figure_cache().stats()
+    sr.sidebar.markdown(f"**Figure Cache (Rerun)**: {profile.cache.get('hit', 0)} hits, {profile.cache.get('miss', 0)} misses")
+    sr.sidebar.markdown(f"**Figure Cache (Server)**: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['size']}/{cache_stats['maxsize']} entries")
+
 # Function to create the Daily Representation tab of the Streamlit application
 def daily():
-    df = get_data_from_excel() # Getting data from Excel
+    with stage("load"):
+        store = get_data_store() # Getting the data store with the precomputed day offsets
+    
+    first_date, last_date = store.date_bounds() # Getting the dates covered by the data
     
     # Creating a sidebar with options to select a specific day and hour range
     sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select Day:</p>", unsafe_allow_html = True)
     date = sr.sidebar.date_input(
         " ",
         label_visibility = "collapsed",
-        min_value = datetime.date(2010, 1, 1),
-        max_value = datetime.date(2019, 12, 31),
-        value = datetime.date(2010, 1, 1)
+        min_value = first_date,
+        max_value = last_date,
+        value = first_date
     )
     
-    day_of_year = date.timetuple().tm_yday # Calculating the day of the year
+    slct = store.day_numbers(date) # Calculating the slct value, the Day number which determines the data range to be selected
     
-    # Calculating the slct value based on the year, which determines the data range to be selected
-    if ((int(date.year)%10) <= 2):
-        slct = ((int(date.year)%10)*365)+day_of_year
-    elif (((int(date.year)%10) > 2) and ((int(date.year)%10) <= 6)):
-        slct = (((int(date.year)%10)*365)+1)+day_of_year
-    else:
-        slct = (((int(date.year)%10)*365)+2)+day_of_year
-    
-    # Filtering the DataFrame based on the selected day
-    df_selection = df.query(
-        "Day == @slct"
-    )
+    df_selection = daily_series(store, slct) # Getting the rows of the selected day
     
     # Creating a sidebar with options to select an hour range
     sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select Hour Range:</p>", unsafe_allow_html = True)
@@ -80,147 +204,61 @@ def daily():
         step = 1
     )
     
-    df_filtered = df_selection[(df_selection["Hours"] >= min_hour) & (df_selection["Hours"] <= max_hour)] # Fitering the DataFrame based on the selected hour range
-    
-    # Separating the positive and negative values of BESS
-    positive_values = df_filtered[df_filtered['BESS'] > 0]['BESS']
-    negative_values = df_filtered[df_filtered['BESS'] < 0]['BESS']
-    positive_sum = positive_values.sum()
-    negative_sum = negative_values.sum()
+    # Summing the energy of every data type over the selected hours, with the BESS charging and discharging split
+    summary = energy_summary(store, slct, slct, min_hour, max_hour)
     
     #Create sidebars with options to select generation, load and total data types
     sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select Generation Type:</p>", unsafe_allow_html = True)
     y1_variables = sr.sidebar.multiselect(
         " ",
         label_visibility = "collapsed",
-        options = ['PV', 'Wind', 'Grid', 'BESS']
+        options = GRAPH_VARIABLES["generation"]
     )
     
     sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select Load Type:</p>", unsafe_allow_html = True)
     y2_variables = sr.sidebar.multiselect(
         " ",
         label_visibility = "collapsed",
-        options = ['Plant', 'Electrolyzer']
+        options = GRAPH_VARIABLES["load"]
     )
     
     sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select Total Data Type:</p>", unsafe_allow_html = True)
     y3_variables = sr.sidebar.multiselect(
         " ",
         label_visibility = "collapsed",
-        options = ['Generation', 'Load']
+        options = GRAPH_VARIABLES["parallel"]
     )
     
-    # Calculating total energy generation, total energy load and total energy for each selected data type
-    total_energy_generation = {}
-    total_energy_load = {}
-    total_energy = {}
-    for y_variable in y1_variables:
-        energy_generation = df_filtered[(df_filtered["Hours"] >= min_hour) & (df_filtered["Hours"] <= max_hour)][y_variable].sum()
-        total_energy_generation[y_variable] = energy_generation
-    
-    for y_variable in y2_variables:
-        energy_load = df_filtered[(df_filtered["Hours"] >= min_hour) & (df_filtered["Hours"] <= max_hour)][y_variable].sum()
-        total_energy_load[y_variable] = energy_load
-    
-    for y_variable in y3_variables:
-        energy = df_filtered[(df_filtered["Hours"] >= min_hour) & (df_filtered["Hours"] <= max_hour)][y_variable].sum()
-        total_energy[y_variable] = energy
-    
-    # Calculating total energy sum for each selected data type
-    total_energy_generation_sum = 0
-    total_energy_load_sum = 0
-    for y_variable in y1_variables:
-        if y_variable in total_energy_generation:
-            total_energy_generation_sum += total_energy_generation[y_variable]
-    
-    for y_variable in y2_variables:
-        if y_variable in total_energy_load:
-            total_energy_load_sum += total_energy_load[y_variable]
+    figure_cache = get_figure_cache() # Getting the figure cache shared by all sessions
+    
+    # Getting the generation, load and total graphs of the selected data types,
+    # building only the graphs whose own selection is not in the cache yet
+    fig_generation = cached_daily_chart(figure_cache, store, "generation", slct, min_hour, max_hour, y1_variables)
+    fig_load = cached_daily_chart(figure_cache, store, "load", slct, min_hour, max_hour, y2_variables)
+    fig_parallel = cached_daily_chart(figure_cache, store, "parallel", slct, min_hour, max_hour, y3_variables)
     
     sr.title(":chart_with_upwards_trend: Daily Data") # Defining a title for the data visualization
     
     sr.markdown("----") # Adding a horizontal line
     
-    # Creating the graph for generation data
-    fig_generation = px.line(
-        df_filtered,
-        x = "Hours",
-        y = y1_variables,
-        markers = True,
-        color_discrete_sequence = ["#0083B8","#5F94AE","#FFB752","#F9584B"],
-        template = "plotly_white"
-    )
-    
-    # Updating the layout of the graph
-    fig_generation.update_layout(
-        title = dict(text = "<b>Generation Graph</b>", font_size = 24),
-        xaxis = dict(tickmode = "linear"),
-        plot_bgcolor = "rgba(0,0,0,0)",
-        yaxis = (dict(title = "Value (MW)", showgrid = False))
-    )
-    
-    sr.plotly_chart(fig_generation, use_container_width = True) # Displaying the graph
+    show_chart("generation", fig_generation) # Displaying the graph
     
     # Displaying selected generation energy and individual energy values for each selected generation type
-    sr.markdown(f"<h5>Selected Generation Energy: {format_energy(total_energy_generation_sum)}</h5>", unsafe_allow_html = True)
-    for y1_variables, energy_generation in total_energy_generation.items():
-        if y1_variables == 'BESS':
-            sr.markdown(f"**{y1_variables} Energy**: {format_energy(energy_generation)} ({format_energy(abs(negative_sum))} Charging, {format_energy(positive_sum)} Discharging)")
-        else:
-            sr.markdown(f"**{y1_variables} Energy**: {format_energy(energy_generation)}")
+    show_energies(summary, "generation", y1_variables)
             
     sr.markdown("####") # Adding a separator
     
-    # Creating the graph for load data
-    fig_load = px.line(
-        df_filtered,
-        x = "Hours",
-        y = y2_variables,
-        markers = True,
-        color_discrete_sequence = ["#8B7335","#FFD12B"],
-        template = "plotly_white"
-    )
-    
-    # Updating the layout of the graph
-    fig_load.update_layout(
-        title = dict(text = "<b>Load Graph</b>", font_size = 24),
-        xaxis = dict(tickmode = "linear"),
-        plot_bgcolor = "rgba(0,0,0,0)",
-        yaxis = (dict(title = "Value (MW)", showgrid = False))
-    )
-    
-    sr.plotly_chart(fig_load, use_container_width = True) # Displaying the graph
+    show_chart("load", fig_load) # Displaying the graph
     
     # Dislaying selected load energy and individual energy values for each selected load type
-    sr.markdown(f"<h5>Selected Load Energy: {format_energy(total_energy_load_sum)}</h5>", unsafe_allow_html = True)
-    for y2_variables, energy_load in total_energy_load.items():
-        sr.markdown(f"**{y2_variables} Energy**: {format_energy(energy_load)}")
+    show_energies(summary, "load", y2_variables)
         
     sr.markdown("####") # Adding a separator
     
-    # Creating the graph for total generation and total load data
-    fig_parallel = px.line(
-        df_filtered,
-        x = "Hours",
-        y = y3_variables,
-        markers = True,
-        color_discrete_sequence = ["#F4D03F","#E74C3C"],
-        template = "plotly_white"
-    )
-    
-    # Updating the layout of the graph
-    fig_parallel.update_layout(
-        title = dict(text = "<b>Total Generation & Total Load Graph</b>", font_size = 24),
-        xaxis = dict(tickmode = "linear"),
-        plot_bgcolor = "rgba(0,0,0,0)",
-        yaxis = (dict(title = "Value (MW)", showgrid = False))
-    )
-    
-    sr.plotly_chart(fig_parallel,use_container_width = True) # Displaying the graph
+    show_chart("parallel", fig_parallel) # Displaying the graph
     
     # Displaying total energy for each selected total data type
-    for y3_variables, energy in total_energy.items():
-        sr.markdown(f"**{y3_variables} Total Energy**: {format_energy(energy)}")
+    show_energies(summary, "parallel", y3_variables)
     
     # Hiding Streamlit's main menu, header and footer for a cleaner UI
     hide_sr_style = """
@@ -234,265 +272,266 @@ def daily():
 
 # Function to create the Custom Date Range Representation tab of the Streamlit application
 def custom_date():
-    df = get_data_from_excel() # Getting data from Excel
+    with stage("load"):
+        store = get_data_store() # Getting the data store with the precomputed daily rollup and cumulative sums
+    
+    first_date, last_date = store.date_bounds() # Getting the dates covered by the data
     
     # Creating sidebars with options to select a custom date range
     sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select Start Date:</p>", unsafe_allow_html = True)
     start_date = sr.sidebar.date_input(
         label = " ",
         label_visibility = "collapsed",
-        min_value = datetime.date(2010, 1, 1),
-        max_value = datetime.date(2019, 12, 30),
-        value = datetime.date(2010, 1, 1)
+        min_value = first_date,
+        max_value = last_date - datetime.timedelta(days = 1),
+        value = first_date
     )
     
     sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select End Date:</p>", unsafe_allow_html = True)
     end_date = sr.sidebar.date_input(
         label = " ",
         label_visibility = "collapsed",
-        min_value = datetime.date(2010, 1, 2),
-        max_value = datetime.date(2019, 12, 31),
-        value = datetime.date(2010, 1, 2)
+        min_value = first_date + datetime.timedelta(days = 1),
+        max_value = last_date,
+        value = first_date + datetime.timedelta(days = 1)
     )
     
-    # Calculating the day of the year for the start and end dates
-    start_day_of_year = start_date.timetuple().tm_yday
-    end_day_of_year = end_date.timetuple().tm_yday
+    start_slct, end_slct = store.day_numbers([start_date, end_date]).tolist() # Calculating the slct values, the Day numbers of the start and end dates
     
-    # Calculating the slct value for the start and end dates based on the year
-    if ((int(start_date.year)%10) <= 2):
-        start_slct = ((int(start_date.year)%10)*365)+start_day_of_year
-    elif (((int(start_date.year)%10) > 2) and ((int(start_date.year)%10) <= 6)):
-        start_slct = (((int(start_date.year)%10)*365)+1)+start_day_of_year
-    else:
-        start_slct = (((int(start_date.year)%10)*365)+2)+start_day_of_year
-    
-    if ((int(end_date.year)%10) <= 2):
-        end_slct = ((int(end_date.year)%10)*365)+end_day_of_year
-    elif (((int(end_date.year)%10) > 2) and ((int(end_date.year)%10) <= 6)):
-        end_slct = (((int(end_date.year)%10)*365)+1)+end_day_of_year
-    else:
-        end_slct = (((int(end_date.year)%10)*365)+2)+end_day_of_year
-    
-    # Filtering the DataFrame based on the selected date range
-    df_selection = df.query(
-        "Day >= @start_slct and Day <= @end_slct"
-    )
-    
-    # Separating positive and negative values of BESS
-    positive_values = df_selection[df_selection['BESS'] > 0]['BESS']
-    negative_values = df_selection[df_selection['BESS'] < 0]['BESS']
-    positive_sum = positive_values.sum()
-    negative_sum = negative_values.sum()
+    # Summing the energy of every data type over the selected days, with the BESS charging and discharging split
+    summary = energy_summary(store, start_slct, end_slct)
     
     # Creating sidebars with options to select generation, load and total data types
     sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select Generation Type:</p>", unsafe_allow_html = True)
     y1_variables = sr.sidebar.multiselect(
         " ",
         label_visibility = "collapsed",
-        options = ['PV', 'Wind', 'Grid', 'BESS']
+        options = GRAPH_VARIABLES["generation"]
     )
     
     sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select Load Type:</p>", unsafe_allow_html = True)
     y2_variables = sr.sidebar.multiselect(
         " ",
         label_visibility = "collapsed",
-        options = ['Plant', 'Electrolyzer']
+        options = GRAPH_VARIABLES["load"]
     )
     
     sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select Total Data Type:</p>", unsafe_allow_html = True)
     y3_variables = sr.sidebar.multiselect(
         " ",
         label_visibility = "collapsed",
-        options = ['Generation', 'Load']
+        options = GRAPH_VARIABLES["parallel"]
+    )
+    
+    # Creating sidebars with options to control how many points the graphs send to the browser
+    sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select Chart Downsampling:</p>", unsafe_allow_html = True)
+    downsampling_method = sr.sidebar.selectbox(
+        " ",
+        label_visibility = "collapsed",
+        options = METHODS
     )
+    use_webgl = sr.sidebar.checkbox("Use WebGL for large graphs", value = True)
     
-    # Calculating total energy generation, total energy load and total energy for each selected data type
-    total_energy_generation = {}
-    total_energy_load = {}
-    total_energy = {}
-    for y_variable in y1_variables:
-        energy_generation = df_selection.groupby("Day")[y_variable].sum().sum()
-        total_energy_generation[y_variable] = energy_generation
-    
-    for y_variable in y2_variables:
-        energy_load = df_selection.groupby("Day")[y_variable].sum().sum()
-        total_energy_load[y_variable] = energy_load
-    
-    for y_variable in y3_variables:
-        energy = df_selection.groupby("Day")[y_variable].sum().sum()
-        total_energy[y_variable] = energy
-    
-    # Calculating total energy sum for each selected data type
-    total_energy_generation_sum = 0
-    total_energy_load_sum = 0
-    for y_variable in y1_variables:
-        if y_variable in total_energy_generation:
-            total_energy_generation_sum += total_energy_generation[y_variable]
-    
-    for y_variable in y2_variables:
-        if y_variable in total_energy_load:
-            total_energy_load_sum += total_energy_load[y_variable]
+    figure_cache = get_figure_cache() # Getting the figure cache shared by all sessions
+    
+    # Getting the generation, load and total graphs of the selected data types,
+    # building only the graphs whose own selection is not in the cache yet
+    fig_generation = cached_custom_date_chart(figure_cache, store, "generation", start_slct, end_slct, y1_variables, downsampling_method, use_webgl)
+    fig_load = cached_custom_date_chart(figure_cache, store, "load", start_slct, end_slct, y2_variables, downsampling_method, use_webgl)
+    fig_parallel = cached_custom_date_chart(figure_cache, store, "parallel", start_slct, end_slct, y3_variables, downsampling_method, use_webgl)
     
     sr.title(":chart_with_upwards_trend: Custom Date Range Data") # Defining a title for the data visualization
     
     sr.markdown("----") # Adding a horizontal line
     
-    fig_generation = go.Figure() # Creating the graph for generation data
+    show_chart("generation", fig_generation) # Displaying the graph
     
-    colors = ["#A93226","#6C3483","#0E6655","#F1C40F","#D35400","#616A6B","#2C3E50","#2ECC71"] # Defining a list of colors to be used for different lines in the graphs
+    # Displaying selected generation energy and individual energy values for each selected generation type
+    show_energies(summary, "generation", y1_variables)
+            
+    sr.markdown("####") # Adding a separator
     
-    # Grouping the data by day and calculating maximum and minimum values
-    max_values = df_selection.groupby("Day").max().reset_index()
-    min_values = df_selection.groupby("Day").min().reset_index()
+    show_chart("load", fig_load) # Displaying the graph
     
-    # Converting day numbers to actual dates for x-axis ticks
-    start_date_datetime = datetime.date(int(start_date.year), 1, 1) + timedelta(days = start_day_of_year - 1)
-    end_date_datetime = datetime.date(int(end_date.year), 1, 1) + timedelta(days = end_day_of_year - 1)
+    # Dislaying selected load energy and individual energy values for each selected load type
+    show_energies(summary, "load", y2_variables)
+        
+    sr.markdown("####") # Adding a separator
     
-    x_ticks = pd.date_range(start_date_datetime, end_date_datetime).strftime('%d/%m/%y').tolist() # Creating custom x-axis ticks with formatted dates in 'DD/MM/YY' format
+    show_chart("parallel", fig_parallel) # Displaying the graph
     
-    for i, y_variable in enumerate(y1_variables): # Iterating through the different generation sources
+    # Displaying total energy for each selected total data type
+    show_energies(summary, "parallel", y3_variables)
     
-        # Calculating the maximum and minimum values for the current generation source
-        max_values = df_selection.groupby("Day")[y_variable].max().reset_index()
-        min_values = df_selection.groupby("Day")[y_variable].min().reset_index()
-        
-        # Adding a trace for the maximum values to the graph
-        fig_generation.add_trace(go.Line(
-            x = max_values["Day"],
-            y = max_values[y_variable],
-            mode = 'lines+markers',
-            line = dict(color = colors[i % len(colors)]),
-            name = f"{y_variable} (Max)")
-        )
-        
-        # Adding a trace for the minimum values to the graph with a dashed line
-        fig_generation.add_trace(go.Line(
-            x = min_values["Day"],
-            y = min_values[y_variable],
-            mode = 'lines+markers',
-            line = dict(color = colors[(i + 2) % len(colors)], dash = "dash"),
-            name = f"{y_variable} (Min)")
-        )
-    
-    # Updating the layout of the graph
-    fig_generation.update_layout(
-        title = dict(text = "<b>Generation Graph</b>", font_size = 24),
-        xaxis = dict(title = "Days", tickmode = "array", ticktext = x_ticks, tickvals = max_values["Day"]),
-        yaxis = dict(title = "Value (MW)", showgrid = False),
-        template = "plotly_white",
-        showlegend = True
+    # Hiding Streamlit's main menu, header and footer for a cleaner UI
+    hide_sr_style = """
+                <style>
+                #MainMenu {visibility: hidden;}
+                footer {visibility: hidden;}
+                header {visibility: hidden;}
+                </style>
+    """
+    sr.markdown(hide_sr_style, unsafe_allow_html=True)
+
+# Function to create the Site Comparison tab of the Streamlit application
+def site_comparison():
+    with stage("load"):
+        stores = {SITE_NAME: get_data_store(), **get_site_stores()} # Getting the data stores of every site
+    
+    # Getting the dates covered by the data of any site
+    bounds = [store.date_bounds() for store in stores.values()]
+    first_date, last_date = min(bound[0] for bound in bounds), max(bound[1] for bound in bounds)
+    
+    # Creating sidebars with options to select the compared sites and a custom date range
+    sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select Sites:</p>", unsafe_allow_html = True)
+    sites = sr.sidebar.multiselect(
+        " ",
+        label_visibility = "collapsed",
+        options = list(stores.keys()),
+        default = list(stores.keys())
+    )
+    
+    sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select Start Date:</p>", unsafe_allow_html = True)
+    start_date = sr.sidebar.date_input(
+        label = " ",
+        label_visibility = "collapsed",
+        min_value = first_date,
+        max_value = last_date - datetime.timedelta(days = 1),
+        value = first_date
     )
     
-    sr.plotly_chart(fig_generation, use_container_width = True) # Displaying the graph
+    sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select End Date:</p>", unsafe_allow_html = True)
+    end_date = sr.sidebar.date_input(
+        label = " ",
+        label_visibility = "collapsed",
+        min_value = first_date + datetime.timedelta(days = 1),
+        max_value = last_date,
+        value = min(first_date + datetime.timedelta(days = 30), last_date)
+    )
     
-    # Displaying selected generation energy and individual energy values for each selected generation type
-    sr.markdown(f"<h5>Selected Generation Energy: {format_energy(total_energy_generation_sum)}</h5>", unsafe_allow_html = True)
-    for y1_variables, energy_generation in total_energy_generation.items():
-        if y1_variables == 'BESS':
-            sr.markdown(f"**{y1_variables} Energy**: {format_energy(energy_generation)} ({format_energy(abs(negative_sum))} Charging, {format_energy(positive_sum)} Discharging)")
-        else:
-            sr.markdown(f"**{y1_variables} Energy**: {format_energy(energy_generation)}")
-            
-    sr.markdown("####") # Adding a separator
+    # Creating sidebars with options to select the compared data type and how many points the graph sends to the browser
+    sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select Data Type:</p>", unsafe_allow_html = True)
+    variable = sr.sidebar.selectbox(
+        " ",
+        label_visibility = "collapsed",
+        options = VARIABLES
+    )
     
-    fig_load = go.Figure() # Creating the graph for load data
+    sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select Chart Downsampling:</p>", unsafe_allow_html = True)
+    downsampling_method = sr.sidebar.selectbox(
+        " ",
+        label_visibility = "collapsed",
+        options = METHODS
+    )
+    use_webgl = sr.sidebar.checkbox("Use WebGL for large graphs", value = True)
     
-    colors = ["#A93226","#6C3483","#0E6655","#F1C40F","#D35400","#616A6B","#2C3E50","#2ECC71"] # Defining a list of colors to be used for different lines in the graphs
+    # Computing the min/max series and energies of every selected site at once in the site pool
+    with stage("compare"):
+        comparisons = compare_sites({site: stores[site] for site in sites}, start_date, end_date, get_site_pool())
     
-    # Grouping the data by day and calculating maximum and minimum values
-    max_values = df_selection.groupby("Day").max().reset_index()
-    min_values = df_selection.groupby("Day").min().reset_index()
+    sr.title(":chart_with_upwards_trend: Site Comparison") # Defining a title for the data visualization
     
-    for i, y_variable in enumerate(y2_variables): # Iterating through the different load sources
+    sr.markdown("----") # Adding a horizontal line
     
-        # Calculating the maximum and minimum values for the current load source
-        max_values = df_selection.groupby("Day")[y_variable].max().reset_index()
-        min_values = df_selection.groupby("Day")[y_variable].min().reset_index()
-        
-        # Adding a trace for the maximum values to the graph
-        fig_load.add_trace(go.Line(
-            x = max_values["Day"],
-            y = max_values[y_variable],
-            mode = 'lines+markers',
-            line = dict(color = colors[i % len(colors)]),
-            name = f"{y_variable} (Max)")
-        )
-        
-        # Adding a trace for the minimum values to the graph with a dashed line
-        fig_load.add_trace(go.Line(
-            x = min_values["Day"],
-            y = min_values[y_variable],
-            mode = 'lines+markers',
-            line = dict(color = colors[(i + 2) % len(colors)], dash = "dash"),
-            name = f"{y_variable} (Min)")
-        )
-    
-    # Updating the layout of the graph
-    fig_load.update_layout(
-        title = dict(text = "<b>Load Graph</b>", font_size = 24),
-        xaxis = dict(title = "Days", tickmode = "array", ticktext = x_ticks, tickvals = max_values["Day"]),
-        yaxis = dict(title = "Value (MW)", showgrid = False),
-        template = "plotly_white",
-        showlegend = True
-    )
+    if not comparisons:
+        sr.warning("None of the selected sites has data between the selected dates")
+    else:
+        # Getting the graph overlaying the selected sites, building it only when it is not in the cache yet
+        fig = cached_site_comparison_chart(get_figure_cache(), comparisons, start_date, end_date, variable, downsampling_method, use_webgl)
+        show_chart("sites", fig) # Displaying the graph
+    
+        # Displaying the energy and the lowest and highest values of the selected data type at each site
+        with stage("format"):
+            for site, comparison in comparisons.items():
+                summary = comparison.summary
+                energy = f"**{site} {variable} Energy**: {format_energy(summary.energy[variable])}"
+                if variable == 'BESS':
+                    energy += f" ({format_energy(abs(summary.charging))} Charging, {format_energy(summary.discharging)} Discharging)"
+                sr.markdown(f"{energy}, between {summary.minimum[variable]:.3f} MW and {summary.maximum[variable]:.3f} MW")
+            for site in sites:
+                if site not in comparisons:
+                    sr.markdown(f"**{site}**: no data between the selected dates")
     
-    sr.plotly_chart(fig_load, use_container_width = True) # Displaying the graph
+    # Hiding Streamlit's main menu, header and footer for a cleaner UI
+    hide_sr_style = """
+                <style>
+                #MainMenu {visibility: hidden;}
+                footer {visibility: hidden;}
+                header {visibility: hidden;}
+                </style>
+    """
+    sr.markdown(hide_sr_style, unsafe_allow_html = True)
+
+# Function to format a KPI value with its unit, energies in appropriate units
+def format_kpi(value, unit):
+    if value != value: # NaN, for example an efficiency without any charged energy
+        return "n/a"
+    if unit == "MWh":
+        return format_energy(value)
+    return f"{value:.2f} %" if unit == "%" else f"{value:.2f} {unit}"
+
+# Function to create the Key Performance Indicators tab of the Streamlit application
+def key_performance_indicators():
+    with stage("load"):
+        store = get_data_store() # Getting the data store with the precomputed daily cumulative sums
     
-    # Dislaying selected load energy and individual energy values for each selected load type
-    sr.markdown(f"<h5>Selected Load Energy: {format_energy(total_energy_load_sum)}</h5>", unsafe_allow_html = True)
-    for y2_variables, energy_load in total_energy_load.items():
-        sr.markdown(f"**{y2_variables} Energy**: {format_energy(energy_load)}")
-        
-    sr.markdown("####") # Adding a separator
+    first_date, last_date = store.date_bounds() # Getting the dates covered by the data
     
-    fig_parallel = go.Figure() # Creating the graph for total generation and load data
+    # Creating sidebars with options to select a custom date range
+    sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select Start Date:</p>", unsafe_allow_html = True)
+    start_date = sr.sidebar.date_input(
+        label = " ",
+        label_visibility = "collapsed",
+        min_value = first_date,
+        max_value = last_date,
+        value = first_date
+    )
     
-    colors = ["#A93226","#6C3483","#0E6655","#F1C40F","#D35400","#616A6B","#2C3E50","#2ECC71"] # Defining a list of colors to be used for different lines in the graphs
+    sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select End Date:</p>", unsafe_allow_html = True)
+    end_date = sr.sidebar.date_input(
+        label = " ",
+        label_visibility = "collapsed",
+        min_value = first_date,
+        max_value = last_date,
+        value = last_date
+    )
     
-    # Grouping the data by day and calculating maximum and minimum values
-    max_values = df_selection.groupby("Day").max().reset_index()
-    min_values = df_selection.groupby("Day").min().reset_index()
+    start_slct, end_slct = store.day_numbers([start_date, end_date]).tolist() # Calculating the slct values, the Day numbers of the start and end dates
     
-    for i, y_variable in enumerate(y3_variables): # Iterating through the different total energy sources
+    # Creating sidebars with options to select the graphed KPI and how many points the graph sends to the browser
+    sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select KPI:</p>", unsafe_allow_html = True)
+    kpi = sr.sidebar.selectbox(
+        " ",
+        label_visibility = "collapsed",
+        options = list(KPIS.keys())
+    )
     
-        # Calculating the maximum and minimum values for the current total energy source
-        max_values = df_selection.groupby("Day")[y_variable].max().reset_index()
-        min_values = df_selection.groupby("Day")[y_variable].min().reset_index()
-        
-        # Adding a trace for the maximum values to the graph
-        fig_parallel.add_trace(go.Line(
-            x = max_values["Day"],
-            y = max_values[y_variable],
-            mode = 'lines+markers',
-            line = dict(color = colors[(i + 4) % len(colors)]),
-            name = f"{y_variable} (Max)")
-        )
-        
-        # Adding a trace for the minimum values to the graph with a dashed line
-        fig_parallel.add_trace(go.Line(
-            x = min_values["Day"],
-            y = min_values[y_variable],
-            mode = 'lines+markers',
-            line = dict(color = colors[(i + 6) % len(colors)], dash = "dash"),
-            name = f"{y_variable} (Min)")
-        )
-    
-    # Updating the layout of the graph
-    fig_parallel.update_layout(
-        title = dict(text = "<b>Total Generation & Total Load Graph</b>", font_size = 24),
-        xaxis = dict(title = "Days", tickmode = "array", ticktext = x_ticks, tickvals = max_values["Day"]),
-        yaxis = dict(title = "Value (MW)", showgrid = False),
-        template = "plotly_white",
-        showlegend = True
+    sr.sidebar.markdown("<p style = 'font-weight: bold; font-size: 20px;'>Select Chart Downsampling:</p>", unsafe_allow_html = True)
+    downsampling_method = sr.sidebar.selectbox(
+        " ",
+        label_visibility = "collapsed",
+        options = METHODS
     )
+    use_webgl = sr.sidebar.checkbox("Use WebGL for large graphs", value = True)
     
-    sr.plotly_chart(fig_parallel, use_container_width = True) # Displaying the graph
+    sr.title(":chart_with_upwards_trend: Key Performance Indicators") # Defining a title for the data visualization
     
-    # Displaying total energy for each selected total data type
-    for y3_variables, energy in total_energy.items():
-        sr.markdown(f"**{y3_variables} Total Energy**: {format_energy(energy)}")
+    sr.markdown("----") # Adding a horizontal line
+    
+    if start_slct > end_slct:
+        sr.warning("The start date is after the end date")
+    else:
+        # Looking up every KPI over the selected dates in the daily cumulative sums
+        values = kpi_totals(store, start_slct, end_slct, ratings = KPI_RATINGS)
+        
+        # Getting the graph of the selected KPI per period, building it only when it is not in the cache yet
+        fig = cached_kpi_chart(get_figure_cache(), store, start_slct, end_slct, kpi, KPI_RATINGS, downsampling_method, use_webgl)
+        show_chart("kpis", fig) # Displaying the graph
+        
+        # Displaying the value of every KPI over the selected dates
+        with stage("format"):
+            for name, (unit, _) in KPIS.items():
+                sr.markdown(f"**{name}**: {format_kpi(values[name], unit)}")
     
     # Hiding Streamlit's main menu, header and footer for a cleaner UI
     hide_sr_style = """
@@ -502,12 +541,41 @@ def custom_date():
                 header {visibility: hidden;}
                 </style>
     """
-    sr.markdown(hide_sr_style, unsafe_allow_html=True)
+    sr.markdown(hide_sr_style, unsafe_allow_html = True)
+
+# Function to rerun the session when new hourly rows have been ingested since it was last drawn
+@sr.fragment(run_every = REFRESH_SECONDS)
+def refresh_on_new_data():
+    version = get_data_store().version
+    if sr.session_state.setdefault("data_version", version) != version:
+        sr.session_state["data_version"] = version
+        sr.rerun()
+
+# Function to show the warming state while the warm-up loads the data, rerunning the session once the data is ready
+@sr.fragment(run_every = WARMING_POLL_SECONDS)
+def wait_for_warm_up():
+    warm_up = get_warm_up()
+    if warm_up.live is not None:
+        sr.rerun()
+    if warm_up.error is not None:
+        sr.error(f"Loading the data failed: {warm_up.error}")
+        if sr.button("Retry"):
+            get_warm_up.clear()
+            sr.rerun()
+        return
+    sr.info(f":hourglass_flowing_sand: Warming up the dashboard: {warm_up.stage} ({warm_up.elapsed():.0f} s)")
+
+# Showing the warming state instead of the tabs until the data is loaded
+if get_live_store() is None:
+    wait_for_warm_up()
+    sr.stop()
 
 # Dictionary to map tab names to their corresponding functions
 tabs = {
         "Daily Representation": daily,
         "Custom Date Range Representation": custom_date,
+        "Site Comparison": site_comparison,
+        "Key Performance Indicators": key_performance_indicators,
 }
 
 default_tab = "Daily Representation" # Default tab to be shown when the application is loaded
@@ -521,4 +589,12 @@ selected_tab = sr.sidebar.radio(
     index = list(tabs.keys()).index(default_tab)
 )
 
-tabs[selected_tab]() # Calling the selected tab function to dislay its content
\ No newline at end of file
+profile = start_rerun(tabs[selected_tab].__name__, detailed = sr.session_state.get("show_profile", False)) # Profiling this rerun, measuring payloads only while the panel is shown
+
+tabs[selected_tab]() # Calling the selected tab function to dislay its content
+
+finish_rerun() # Logging the profile of this rerun and adding it to the server metrics
+
+profiling_panel(profile) # Displaying the profiling panel when it is enabled
+
+refresh_on_new_data() # Checking periodically for newly ingested data
\ No newline at end of file
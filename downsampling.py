@@ -0,0 +1,83 @@
+# Importing the necessary libraries
+import numpy as np
+
+CHART_WIDTH_PX = 1200 # Approximate plot width in pixels of a chart drawn with use_container_width in the wide layout
+POINTS_PER_PIXEL = 1 # Points kept per horizontal pixel, more than this cannot be told apart on screen
+WEBGL_THRESHOLD = 2000 # Point count per trace above which charts switch to WebGL rendering when allowed
+MAX_TICKS = 24 # Maximum number of labelled ticks on a date axis
+
+METHODS = ['Min/Max', 'LTTB', 'Full'] # Downsampling methods offered in the sidebar
+
+# Function to return how many points a trace may send to the browser for a chart of the given width
+def point_budget(width_px = CHART_WIDTH_PX, points_per_pixel = POINTS_PER_PIXEL):
+    return max(int(width_px * points_per_pixel), 3)
+
+# Function to downsample a series with Largest-Triangle-Three-Buckets, keeping the points that best preserve its visual shape
+def lttb(x, y, threshold):
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x_values = np.asarray(x, dtype = np.float64)
+    y_values = np.asarray(y, dtype = np.float64)
+
+    # Splitting the points between the first and the last into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    edges = np.append(edges, n)
+    selected = np.empty(threshold, dtype = np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_start, next_stop = edges[i + 1], edges[i + 2]
+
+        # Averaging the next bucket, which acts as the third vertex of the triangle
+        next_x = x_values[next_start:next_stop].mean()
+        next_y = np.nanmean(y_values[next_start:next_stop]) if np.any(~np.isnan(y_values[next_start:next_stop])) else y_values[previous]
+
+        # Picking the point of the current bucket forming the largest triangle with the previous pick and the next average
+        area = np.abs(
+            (x_values[previous] - next_x) * (y_values[start:stop] - y_values[previous])
+            - (x_values[previous] - x_values[start:stop]) * (next_y - y_values[previous])
+        )
+        previous = start + int(np.argmax(np.nan_to_num(area, nan = -1.0)))
+        selected[i + 1] = previous
+    return selected
+
+# Function to downsample a series by keeping the minimum and maximum point of each bucket, so peaks are never lost
+def min_max_decimate(y, threshold):
+    n = len(y)
+    buckets = threshold // 2
+    if buckets < 1 or 2 * buckets >= n:
+        return np.arange(n)
+    width = -(-n // buckets)
+    values = np.asarray(y, dtype = np.float64)
+
+    # Padding to a whole number of equal buckets and reducing every bucket in one vectorized call
+    padded = np.full(buckets * width, np.nan)
+    padded[:n] = values
+    padded = padded.reshape(buckets, width)
+    offsets = np.arange(buckets) * width
+    lows = offsets + np.argmin(np.where(np.isnan(padded), np.inf, padded), axis = 1)
+    highs = offsets + np.argmax(np.where(np.isnan(padded), -np.inf, padded), axis = 1)
+    selected = np.unique(np.concatenate((lows, highs)))
+    return selected[selected < n]
+
+# Function to downsample the x and y values of a trace to the point budget with the chosen method
+def downsample(x, y, method = 'Min/Max', budget = None):
+    budget = point_budget() if budget is None else budget
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if method == 'LTTB':
+        selected = lttb(x, y, budget)
+    elif method == 'Min/Max':
+        selected = min_max_decimate(y, budget)
+    else:
+        return x, y
+    return x[selected], y[selected]
+
+# Function to thin out the values of a date axis so at most max_ticks labels are sent to the browser
+def thin_ticks(tickvals, max_ticks = MAX_TICKS):
+    step = max(-(-len(tickvals) // max_ticks), 1)
+    return np.asarray(tickvals)[::step]
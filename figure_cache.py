@@ -0,0 +1,54 @@
+# Importing the necessary libraries
+import threading
+from collections import OrderedDict
+import plotly.io as pio
+from profiling import record_cache, stage
+
+FIGURE_CACHE_SIZE = 256 # Maximum number of graphs kept, the least recently used one is dropped first
+
+# Class implementing a bounded, thread-safe LRU cache of serialized figures,
+# shared by every session of the server process
+class FigureCache:
+    def __init__(self, maxsize = FIGURE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Method to return the entry stored under a key (marking it as recently used), or None on a miss
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    # Method to store an entry under a key, evicting the least recently used entries beyond the size limit
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last = False)
+
+    # Method to return the hit and miss counters together with the current number of entries
+    def stats(self):
+        with self._lock:
+            return dict(hits = self.hits, misses = self.misses, size = len(self._entries), maxsize = self.maxsize)
+
+# Function to return the figure for a key from the cache, calling build() and storing its result on a miss
+# Figures are kept as JSON so cached entries are compact and can never be mutated by the session that reads them
+def cached_chart(cache, key, build):
+    figure_json = cache.get(key)
+    record_cache(figure_json is not None)
+    if figure_json is None:
+        fig = build()
+        with stage("cache"):
+            cache.put(key, fig.to_json())
+        return fig
+    with stage("cache"):
+        return pio.from_json(figure_json)
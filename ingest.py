@@ -0,0 +1,83 @@
+# Importing the necessary libraries
+import glob
+import logging
+import os
+import threading
+import pandas as pd
+
+INGEST_INTERVAL = 10 # Seconds between two scans of the drop directory
+DROP_PATTERNS = ['*.csv', '*.parquet'] # Files picked up from the drop directory (Parquet drops need pyarrow installed)
+
+logger = logging.getLogger(__name__)
+
+# Function to read one dropped file of hourly rows into a DataFrame
+def read_drop(path):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+# Class holding the current data store, swapped for a new version each time rows are appended
+class LiveStore:
+    def __init__(self, store):
+        self.current = store
+        self._lock = threading.Lock()
+
+    # Method to append hourly rows to the current store and return the resulting data version
+    def append(self, rows):
+        with self._lock:
+            self.current = self.current.append(rows)
+            return self.current.version
+
+# Class tailing a directory of CSV/Parquet drops, returning each file only once in the order the files arrived
+# A file is only returned once its size has stayed the same between two polls, so files still being written are left alone
+class DropTailer:
+    def __init__(self, directory, patterns = DROP_PATTERNS):
+        self.directory = directory
+        self.patterns = patterns
+        self.seen = set()
+        self.sizes = {}
+
+    # Method to return the paths of the files completed since the previous poll, oldest first
+    def poll(self):
+        if not os.path.isdir(self.directory):
+            return []
+        sizes = {}
+        for pattern in self.patterns:
+            for path in glob.glob(os.path.join(self.directory, pattern)):
+                if path not in self.seen:
+                    try:
+                        sizes[path] = os.path.getsize(path)
+                    except OSError:
+                        continue # The file was removed between listing and reading its size
+        settled = [path for path, size in sizes.items() if size > 0 and self.sizes.get(path) == size]
+        self.sizes = sizes
+        new_paths = sorted(settled, key = lambda path: (os.path.getmtime(path), path))
+        self.seen.update(new_paths)
+        return new_paths
+
+# Function to ingest every new drop into the live store, skipping (and logging) files that cannot be read
+def ingest_drops(live, tailer):
+    for path in tailer.poll():
+        try:
+            rows = read_drop(path)
+            previous = live.current.version
+            version = live.append(rows)
+            if version == previous:
+                logger.info("No new rows in %s (%d rows read, data version still %s)", path, len(rows), version)
+            else:
+                logger.info("Ingested %s (%d rows read, data version %s)", path, len(rows), version)
+        except (OSError, ValueError, ImportError) as error:
+            logger.warning("Skipping drop %s: %s", path, error)
+
+# Function to start a daemon thread that keeps ingesting drops from a directory into the live store
+def start_drop_watcher(live, directory, interval = INGEST_INTERVAL):
+    tailer = DropTailer(directory)
+    stop = threading.Event()
+
+    def watch():
+        while not stop.is_set():
+            ingest_drops(live, tailer)
+            stop.wait(interval)
+
+    threading.Thread(target = watch, name = "drop-watcher", daemon = True).start()
+    return stop
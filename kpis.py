@@ -0,0 +1,72 @@
+# Key performance indicators of the plant (renewable share of the load, Grid import and export, BESS round-trip efficiency
+# and cycles, Electrolyzer capacity factor), computed from totals the data stores already keep materialized: the daily
+# cumulative sums extended with every append (see build_daily_cumulative_sums in power_data.py). The totals of a range of
+# days, or of every period of a resolution tier, take two lookups per period, so a KPI over years costs as much as over a day
+
+# Importing the necessary libraries
+import numpy as np
+import pandas as pd
+from power_data import SPLITS, VARIABLES
+from profiling import stage
+
+# Function to divide totals elementwise, with NaN where the denominator is zero or missing
+def ratio(numerator, denominator):
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+# KPIs by name, each with its unit and the function computing it from totals (arrays of one value per period, keyed like
+# the daily cumulative sums) and the ratings of the equipment
+KPIS = {
+    "Renewable Share of Load": ("%", lambda totals, ratings: 100 * ratio(totals["PV"] + totals["Wind"], totals["Load"])),
+    "Net Grid Import": ("MWh", lambda totals, ratings: totals["Grid"]),
+    "Grid Import": ("MWh", lambda totals, ratings: totals["Grid_import"]),
+    "Grid Export": ("MWh", lambda totals, ratings: np.abs(totals["Grid_export"])),
+    "BESS Round-Trip Efficiency": ("%", lambda totals, ratings: 100 * ratio(totals["BESS_discharge"], np.abs(totals["BESS_charge"]))),
+    "BESS Cycles": ("cycles", lambda totals, ratings: ratio(np.abs(totals["BESS_charge"]), ratings["BESS"])),
+    "Electrolyzer Capacity Factor": ("%", lambda totals, ratings: 100 * ratio(totals["Electrolyzer"], ratings["Electrolyzer"] * totals["Rows"]))
+}
+
+# Function to return the ratings of the equipment the KPIs are relative to (the rated power of the Electrolyzer in MW and the
+# storage capacity of the BESS in MWh, see KPI_RATINGS in dashboard.py): the given ones or, for those missing or left as None,
+# the estimates the data store keeps for its current data (see PowerStoreBase.estimated_ratings)
+def kpi_ratings(store, ratings = None):
+    given = {name: value for name, value in (ratings or {}).items() if value is not None}
+    return dict(store.estimated_ratings(), **given)
+
+# Function to compute every KPI from totals, as arrays of one value per period
+def compute_kpis(totals, ratings):
+    return {name: np.asarray(function(totals, ratings), dtype = np.float64) for name, (unit, function) in KPIS.items()}
+
+# Function to return the totals of the hourly rows of a day narrowed to an inclusive range of hours, keyed like the daily
+# cumulative sums, from one pass of the aggregation kernel over those (at most a day of) rows
+def hour_totals(store, day, min_hour, max_hour):
+    statistics = store.hour_statistics(day, min_hour, max_hour)
+    if len(statistics.sums) == 0: # No row selected
+        return dict.fromkeys(store.daily_cumulative, np.zeros(1))
+    totals = {variable: statistics.sums[:, i] for i, variable in enumerate(VARIABLES)}
+    for i, (negative, positive) in enumerate(SPLITS.values()):
+        totals[negative] = statistics.charge[:, i]
+        totals[positive] = statistics.discharge[:, i]
+    totals["Rows"] = statistics.counts.max(axis = 1).astype(np.float64)
+    return totals
+
+# Function to return every KPI over an inclusive range of Day numbers, optionally narrowed to an inclusive range of hours
+# when the range is a single day, by name. Whole days are looked up in the daily cumulative sums
+def kpi_totals(store, start_day, end_day, min_hour = None, max_hour = None, ratings = None):
+    with stage("kpis"):
+        if min_hour is not None and start_day == end_day:
+            totals = hour_totals(store, start_day, min_hour, max_hour)
+        else:
+            totals = store.period_totals([start_day], end_day)
+        return {name: float(values[0]) for name, values in compute_kpis(totals, kpi_ratings(store, ratings)).items()}
+
+# Function to return the resolution tier picked for an inclusive range of Day numbers (at least daily, as the KPIs of single
+# hours mean little) together with every KPI per period of it, indexed by the first Day number of the period within the range
+def kpi_series(store, start_day, end_day, ratings = None):
+    with stage("kpis"):
+        tier = store.choose_tier(start_day, end_day)
+        if tier == 'hour':
+            tier = 'day'
+        period_days = np.maximum(store.tier_range(tier, start_day, end_day).index.to_numpy(), start_day) # The first period may start before the range
+        kpis = compute_kpis(store.period_totals(period_days, end_day), kpi_ratings(store, ratings))
+        return tier, pd.DataFrame(kpis, index = pd.Index(period_days, name = "Day"))
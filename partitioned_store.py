@@ -0,0 +1,175 @@
+# Out-of-core data store over a Parquet dataset partitioned by site and year. Only the daily rollup and the resolution
+# pyramid are kept in memory; hourly rows are read on demand with the site, year and day filters pushed down to the scan,
+# so memory stays flat however many years or sites the dataset holds
+#
+# Usage: python partitioned_store.py <workbook> <dataset directory> [site]
+
+# Importing the necessary libraries
+import copy
+import glob
+import hashlib
+import os
+import sys
+import uuid
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+try:
+    import fcntl # POSIX file locks
+except ImportError:
+    fcntl = None
+    import msvcrt # Windows file locks
+from power_data import (DATA_START_DATE, VARIABLES, PowerStoreBase, build_daily_cumulative_sums, build_daily_table, build_day_offsets,
+                        build_pyramid, build_timestamps, combine_daily_tables, days_to_dates, extend_daily_cumulative_sums, fractional_days,
+                        hour_tier_frame, load_power_data, rows_to_append, sort_by_day_and_hour)
+
+DEFAULT_SITE = "main" # Site name used when a data set has no site of its own
+ROW_GROUP_ROWS = 131072 # Rows per Parquet row group, the unit the scanner reads or skips
+SCAN_BATCH_ROWS = 262144 # Rows held in memory at once while scanning the whole dataset
+PARTITION_COLUMNS = ["Site", "Year"]
+PARTITIONING = ds.partitioning(pa.schema([("Site", pa.string()), ("Year", pa.int32())]), flavor = "hive")
+APPEND_LOCK = ".append.lock" # Lock file serializing appends to a dataset across processes (ignored by the scanner, like any dot file)
+
+# Class holding an exclusive lock on a file across processes while its block runs. On Windows, waiting for the lock
+# gives up with OSError after about ten seconds
+class FileLock:
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+
+    def __enter__(self):
+        self.handle = open(self.path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+        else:
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+        else:
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+        self.handle.close()
+        self.handle = None
+
+# Function to write hourly rows of one site into the dataset as new files, partitioned by site and year
+def write_partitioned(df, root, site = DEFAULT_SITE, start_date = DATA_START_DATE):
+    table = df.reset_index(drop = True)
+    table["Site"] = site
+    table["Year"] = pd.DatetimeIndex(days_to_dates(table["Day"].to_numpy(), start_date)).year.astype(np.int32)
+    ds.write_dataset(
+        pa.Table.from_pandas(table, preserve_index = False),
+        root,
+        format = "parquet",
+        partitioning = PARTITIONING,
+        basename_template = f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior = "overwrite_or_ignore",
+        max_rows_per_group = ROW_GROUP_ROWS
+    )
+
+# Function to identify the current contents of a dataset from the names, sizes and modification times of its files
+def dataset_version(root):
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(root, "**", "*.parquet"), recursive = True)):
+        stat = os.stat(path)
+        digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
+
+# Function to build the daily rollup of the rows matching a filter, one scan batch at a time
+def scan_daily_table(dataset, row_filter):
+    partials = []
+    for batch in dataset.to_batches(columns = ["Day", "Hours"] + VARIABLES, filter = row_filter, batch_size = SCAN_BATCH_ROWS):
+        if batch.num_rows:
+            partials.append(build_daily_table(batch.to_pandas()))
+    if not partials:
+        raise ValueError("The dataset has no rows for the selected site")
+    return combine_daily_tables(partials)
+
+# Class answering the dashboard's queries from a partitioned Parquet dataset without loading its hourly rows
+class PartitionedStore(PowerStoreBase):
+    def __init__(self, root, site = DEFAULT_SITE, start_date = DATA_START_DATE):
+        self.root = root
+        self.site = site
+        self.start_date = start_date
+        self.dataset = ds.dataset(root, format = "parquet", partitioning = PARTITIONING)
+        self.columns = [name for name in self.dataset.schema.names if name not in PARTITION_COLUMNS]
+        self.version = dataset_version(root)
+        self.daily = scan_daily_table(self.dataset, ds.field("Site") == site)
+        self.daily_cumulative = build_daily_cumulative_sums(self.daily)
+        self.pyramid = build_pyramid(self.daily, start_date)
+
+    # Method to build the pushed-down filter selecting the rows of this site in an inclusive range of Day numbers,
+    # including the year bounds so partitions outside the range are never opened
+    def window_filter(self, start_day, end_day):
+        first_year, last_year = pd.DatetimeIndex(self.day_dates([start_day, end_day])).year
+        return (
+            (ds.field("Site") == self.site)
+            & (ds.field("Year") >= int(first_year)) & (ds.field("Year") <= int(last_year))
+            & (ds.field("Day") >= int(start_day)) & (ds.field("Day") <= int(end_day))
+        )
+
+    # Method to read the hourly rows of an inclusive range of Day numbers, sorted by Day and Hours
+    def read_rows(self, start_day, end_day):
+        table = self.dataset.to_table(columns = self.columns, filter = self.window_filter(start_day, end_day))
+        return sort_by_day_and_hour(table.to_pandas())
+
+    # Method to read the hourly rows of a dataset from a Day number onwards, sorted by Day and Hours
+    def read_rows_since(self, dataset, start_day):
+        first_year = pd.DatetimeIndex(self.day_dates([start_day])).year[0]
+        row_filter = (ds.field("Site") == self.site) & (ds.field("Year") >= int(first_year)) & (ds.field("Day") >= int(start_day))
+        return sort_by_day_and_hour(dataset.to_table(columns = self.columns, filter = row_filter).to_pandas())
+
+    # Method to return the hourly rows of a day, optionally narrowed to an inclusive range of hours
+    def day_frame(self, day, min_hour = None, max_hour = None):
+        df = self.read_rows(day, day)
+        days = df["Day"].to_numpy()
+        first_day, day_offsets = build_day_offsets(days)
+        df.index = build_timestamps(days, first_day, day_offsets, self.start_date)
+        if min_hour is not None:
+            df = df[(df["Hours"] >= min_hour) & (df["Hours"] <= max_hour)]
+        return df
+
+    # Method to return the hourly rows of an inclusive range of Day numbers as a resolution tier
+    def hour_tier(self, start_day, end_day):
+        df = self.read_rows(start_day, end_day)
+        days = df["Day"].to_numpy()
+        first_day, day_offsets = build_day_offsets(days)
+        return hour_tier_frame(df, fractional_days(days, first_day, day_offsets))
+
+    # Method to return a new store with rows appended as new files of the dataset, recomputing the daily rollup
+    # and extending its cumulative sums only for the days the rows touch. Every server process may ingest the same drop,
+    # so the rows are checked against the rows on disk rather than this snapshot of the dataset, under a lock held across
+    # processes; the new store also picks up the rows other processes appended since this one was opened
+    def append(self, rows):
+        last_day = int(self.daily.index[-1])
+        with FileLock(os.path.join(self.root, APPEND_LOCK)):
+            dataset = ds.dataset(self.root, format = "parquet", partitioning = PARTITIONING)
+            stored = self.read_rows_since(dataset, last_day) # The last day of this snapshot and any day appended since
+            rows = rows_to_append(rows, stored)
+            if len(rows):
+                write_partitioned(rows, self.root, self.site, self.start_date)
+                dataset = ds.dataset(self.root, format = "parquet", partitioning = PARTITIONING)
+            version = dataset_version(self.root)
+        if version == self.version:
+            return self
+
+        store = copy.copy(self)
+        store.dataset = dataset
+        store.version = version
+        end_day = int(rows["Day"].iat[-1]) if len(rows) else int(stored["Day"].iat[-1])
+        tail = scan_daily_table(store.dataset, store.window_filter(last_day, end_day))
+        kept = len(self.daily) - 1 # Days before the last day of this snapshot, which later rows may have completed
+        store.daily = pd.concat([self.daily.iloc[:kept], tail])
+        store.daily_cumulative = extend_daily_cumulative_sums(self.daily_cumulative, store.daily, kept)
+        store.pyramid = build_pyramid(store.daily, self.start_date)
+        return store
+
+# Converting a workbook into a partitioned dataset from the command line
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit("Usage: python partitioned_store.py <workbook> <dataset directory> [site]")
+    write_partitioned(load_power_data(sys.argv[1]), sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else DEFAULT_SITE)
@@ -0,0 +1,694 @@
+# Importing the necessary libraries
+import copy
+import datetime
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+import numpy as np
+import pandas as pd
+from aggregation import segment_starts, segment_statistics, stack_columns
+
+# Default location of the source workbook and of the columnar cache built from it
+DATA_FILE = 'D:/GitHub/Dashboard/2022_05_13_HourlyPowerData.xlsx'
+DATA_SHEET = 'Sheet3'
+DATA_COLUMNS = 'B:L'
+DATA_ROWS = 87649
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+DATA_START_DATE = datetime.date(2010, 1, 1) # Calendar date of Day 1 in the data set
+
+CACHE_FORMAT = 6 # Bumped whenever the on-disk layout changes so stale caches are rebuilt
+
+# Column types of the hourly rows once loaded: Day and Hours as the smallest unsigned integers holding their range (at least
+# these types), power values as single precision floats. Every total is still accumulated in double precision
+DAY_DTYPE = np.uint16
+HOUR_DTYPE = np.uint8
+VALUE_DTYPE = np.float32
+PRECISION_TOLERANCE = 1e-6 # Largest error of a float32 column's total allowed by the precision check, relative to the total of its magnitudes
+
+logger = logging.getLogger(__name__)
+
+# Function to compute the SHA-256 hash of a file, reading it in chunks to keep memory flat
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Function to return the cache directory used for a given workbook and sheet
+def cache_path(path, sheet_name, cache_dir = CACHE_DIR):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{stem}_{sheet_name}")
+
+# Function to read the manifest of a columnar cache, returning None when it is missing or unreadable
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, "manifest.json"), "r") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+# Function to write a file atomically so concurrent readers never see a half-written file
+def write_atomic(path, write, mode = "wb"):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, mode) as handle:
+        write(handle)
+    os.replace(tmp_path, path)
+
+# Function to return the name of the build subdirectory a cache writes the arrays derived from some data into, keyed by the
+# cache format and a hash of the key of the data (such as the hash of the source file). A rebuild then writes new files next
+# to the old ones instead of replacing files other processes may still have memory-mapped, which Windows refuses
+def build_name(key):
+    digest = hashlib.sha256(json.dumps(key, sort_keys = True).encode()).hexdigest()
+    return f"build_{CACHE_FORMAT}_{digest[:16]}"
+
+# Function to write the manifest of a cache pointing at its new build subdirectory, then remove the builds older than the one
+# it replaces (which is kept for the processes that read the previous manifest just before). Builds still memory-mapped by
+# another process cannot be removed on Windows, so they are left for the next rebuild to remove
+def publish_build(directory, manifest):
+    previous = read_manifest(directory) or {}
+    write_atomic(os.path.join(directory, "manifest.json"), lambda handle: json.dump(manifest, handle), mode = "w")
+    for name in os.listdir(directory):
+        if name.startswith("build_") and name not in (manifest["build"], previous.get("build")):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors = True)
+    return manifest
+
+# Function to write named arrays as one .npy file each, returning the [name, file name] pairs to record in a manifest
+def write_arrays(directory, prefix, arrays):
+    os.makedirs(directory, exist_ok = True)
+    entries = []
+    for i, (name, values) in enumerate(arrays.items()):
+        values = np.ascontiguousarray(values)
+        if values.dtype == object:
+            values = values.astype(np.float64)
+        file_name = f"{prefix}_{i:02d}.npy" # Positional file names, since names such as column headers may not be valid file names
+        write_atomic(os.path.join(directory, file_name), lambda handle: np.save(handle, values))
+        entries.append([str(name), file_name])
+    return entries
+
+# Function to open arrays written by write_arrays as read-only memory maps, shared by every process that opens them
+def read_arrays(directory, entries):
+    return {name: np.load(os.path.join(directory, file_name), mmap_mode = 'r') for name, file_name in entries}
+
+# Function to convert a DataFrame into one .npy file per column, written to a build subdirectory keyed by the source file,
+# plus a manifest describing the source file and pointing at that build
+def write_columnar_cache(df, directory, source):
+    build = build_name(source)
+    columns = write_arrays(os.path.join(directory, build), "column", {column: df[column].to_numpy() for column in df.columns})
+    return publish_build(directory, dict(source, format = CACHE_FORMAT, build = build, columns = columns, rows = len(df)))
+
+# Function to open a columnar cache as a DataFrame whose columns are read-only memory maps of the .npy files of its build
+def read_columnar_cache(directory, manifest):
+    return pd.DataFrame(read_arrays(os.path.join(directory, manifest["build"]), manifest["columns"]), copy = False)
+
+# Function to check whether a cache manifest still describes the current source file
+def cache_is_fresh(manifest, stat, path):
+    if manifest is None or manifest.get("format") != CACHE_FORMAT:
+        return False
+    if manifest.get("mtime_ns") == stat.st_mtime_ns and manifest.get("size") == stat.st_size:
+        return True
+    return manifest.get("sha256") == file_hash(path) # The file was touched, so only trust the cache if its contents are unchanged
+
+# Function to parse the workbook with openpyxl, which is only done when the columnar cache is missing or stale
+def read_excel_sheet(path, sheet_name = DATA_SHEET, usecols = DATA_COLUMNS, nrows = DATA_ROWS):
+    df = pd.read_excel(
+        io = path,
+        engine = 'openpyxl',
+        sheet_name = sheet_name,
+        skiprows = 0,
+        usecols = usecols,
+        nrows = nrows
+    )
+    return df
+
+# Function to return the smallest integer type (no smaller than minimum) holding whole values, or None when the values
+# are not all whole numbers (such as a column with blank cells), in which case the column keeps its type
+def integer_dtype(values, minimum):
+    values = np.asarray(values)
+    if len(values) == 0:
+        return np.dtype(minimum)
+    if values.dtype.kind == 'f' and not np.all(np.isfinite(values) & (values == np.round(values))):
+        return None
+    if values.dtype.kind not in 'iuf':
+        return None
+    return np.result_type(minimum, np.min_scalar_type(int(values.min())), np.min_scalar_type(int(values.max())))
+
+# Function to check that a column loses no more than PRECISION_TOLERANCE of its total when stored as float32
+def keeps_precision(values, compact):
+    error = abs(np.nansum(values, dtype = np.float64) - np.nansum(compact, dtype = np.float64))
+    return bool(error <= PRECISION_TOLERANCE * np.nansum(np.abs(values), dtype = np.float64))
+
+# Function to return the hourly rows with compact column types: Day, Hours and other integer columns as small unsigned
+# integers and the power values as float32, halving the size of the columns every store and session reads. With check_precision, the total of
+# every float32 column is compared with its float64 total and columns that would lose precision are kept as float64
+def compact_frame(df, check_precision = False, source = "Rows"):
+    columns = {}
+    kept = []
+    for column in df.columns:
+        values = df[column].to_numpy()
+        dtype = None
+        if column in ("Day", "Hours"):
+            dtype = integer_dtype(values, DAY_DTYPE if column == "Day" else HOUR_DTYPE)
+        elif values.dtype.kind == 'f' or (column in VARIABLES and values.dtype.kind in 'iu'):
+            dtype = np.dtype(VALUE_DTYPE)
+        elif values.dtype.kind in 'iu':
+            dtype = integer_dtype(values, np.uint8) # Other integer columns, such as a running hour count
+        if dtype is None or dtype == values.dtype:
+            columns[column] = values
+            continue
+        compact = values.astype(dtype)
+        if check_precision and dtype.kind == 'f' and not keeps_precision(values, compact):
+            kept.append(column)
+            compact = values
+        columns[column] = compact
+    if kept:
+        logger.warning("%s keep float64 values in the columns %s, which lose precision as float32", source, ", ".join(map(str, kept)))
+    return pd.DataFrame(columns, index = df.index, copy = False)
+
+# Function to keep the columns of the hourly rows the columnar cache can store: numeric, boolean and date columns, object
+# columns of numbers included. Other extra columns of the sheet, such as notes in text, are left out with a warning since
+# no store uses them; the required columns are always kept, so check_schema can report their non-numeric values
+def cacheable_columns(df, source = "Rows"):
+    columns = {}
+    skipped = []
+    for column in df.columns:
+        values = df[column]
+        if values.dtype == object:
+            try:
+                values = pd.to_numeric(values)
+            except (TypeError, ValueError):
+                pass # Holds text, which stays as it is
+        if values.dtype.kind in 'biufmM' or column in REQUIRED_COLUMNS:
+            columns[column] = values
+        else:
+            skipped.append(str(column))
+    if skipped:
+        logger.warning("%s have non-numeric values in the columns %s, which are not loaded", source, ", ".join(skipped))
+    return pd.DataFrame(columns, index = df.index, copy = False)
+
+# Function to load the power data, converting the workbook into a memory-mapped columnar cache of compact column types
+# on first use (see compact_frame for check_precision). Raises ValueError when the sheet lacks a required column or holds
+# non-numeric values in one
+def load_power_data(path = DATA_FILE, sheet_name = DATA_SHEET, usecols = DATA_COLUMNS, nrows = DATA_ROWS, cache_dir = CACHE_DIR,
+                    check_precision = False):
+    directory = cache_path(path, sheet_name, cache_dir)
+    stat = os.stat(path)
+    manifest = read_manifest(directory)
+
+    if not cache_is_fresh(manifest, stat, path):
+        label = f"{os.path.basename(path)} [{sheet_name}]" # Names the sheet in warnings and errors
+        df = cacheable_columns(read_excel_sheet(path, sheet_name, usecols, nrows), label)
+        check_schema(df, label) # Before any column is read, so a sheet of another layout fails with the columns it lacks
+        df = df.dropna(subset = ["Day", "Hours"]).reset_index(drop = True) # Blank rows of the sheet, such as trailing ones
+        df = sort_by_day_and_hour(compact_frame(df, check_precision, label)) # Stored sorted, so stores can use the memory maps as they are
+        source = dict(path = os.path.abspath(path), sheet = sheet_name, mtime_ns = stat.st_mtime_ns, size = stat.st_size, sha256 = file_hash(path))
+        manifest = write_columnar_cache(df, directory, source)
+    elif manifest["mtime_ns"] != stat.st_mtime_ns:
+        # Contents are unchanged, so only refresh the recorded modification time to skip hashing next time
+        manifest = dict(manifest, mtime_ns = stat.st_mtime_ns)
+        write_atomic(os.path.join(directory, "manifest.json"), lambda handle: json.dump(manifest, handle), mode = "w")
+
+    return read_columnar_cache(directory, manifest)
+
+# Function to map dates (a date, a Timestamp or an array of datetime64 values) to Day numbers in one vectorized operation
+def dates_to_days(dates, start_date = DATA_START_DATE):
+    days = (np.asarray(dates, dtype = 'datetime64[D]') - np.datetime64(start_date, 'D')).astype(np.int64) + 1
+    return int(days) if days.ndim == 0 else days
+
+# Function to map Day numbers (a scalar or an array) back to datetime64 dates in one vectorized operation
+def days_to_dates(days, start_date = DATA_START_DATE):
+    return np.datetime64(start_date, 'D') + (np.asarray(days, dtype = np.int64) - 1).astype('timedelta64[D]')
+
+# Function to build the timestamps of sorted hourly rows starting at row first_row, placing each row at its position within its day
+def build_timestamps(days, first_day, day_offsets, start_date = DATA_START_DATE, first_row = 0):
+    positions = first_row + np.arange(len(days)) - day_offsets[days.astype(np.int64) - first_day]
+    return pd.DatetimeIndex(days_to_dates(days, start_date) + positions.astype('timedelta64[h]'), name = "Timestamp")
+
+# Power variables shown by the dashboard and the statistics kept for them in the daily rollup
+VARIABLES = ['PV', 'Wind', 'Grid', 'BESS', 'Plant', 'Electrolyzer', 'Generation', 'Load']
+STATISTICS = ['sum', 'min', 'max', 'mean']
+REQUIRED_COLUMNS = ['Day', 'Hours'] + VARIABLES # Columns every source of hourly rows must provide
+
+# Variables whose energy is also kept split into its negative and positive parts, with the names of both parts:
+# BESS into charging and discharging, Grid into export and import
+SPLITS = {'BESS': ('BESS_charge', 'BESS_discharge'), 'Grid': ('Grid_export', 'Grid_import')}
+SPLIT_INDICES = [VARIABLES.index(variable) for variable in SPLITS] # Columns the aggregation kernel splits, in the order of SPLITS
+SPLIT_COLUMNS = [parts[0] for parts in SPLITS.values()] + [parts[1] for parts in SPLITS.values()] # Every negative part, then every positive part
+
+# Columns of the daily rollup the lowest and highest values over a range of days are found from (its totals come from the
+# daily cumulative sums): the minimums, then the maximums of every variable
+EXTREME_COLUMNS = [f"{variable}_{statistic}" for statistic in ['min', 'max'] for variable in VARIABLES]
+
+# Function to check that hourly rows have every required column with numeric values, raising ValueError naming the source otherwise
+def check_schema(df, source = "Rows"):
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"{source} are missing the columns: {', '.join(missing)}")
+    non_numeric = [column for column in REQUIRED_COLUMNS if not pd.api.types.is_numeric_dtype(df[column])]
+    if non_numeric:
+        raise ValueError(f"{source} have non-numeric values in the columns: {', '.join(non_numeric)}")
+
+# Function to build the per-Day rollup with sum/min/max/mean of every variable plus the sums of the BESS and Grid splits,
+# in double precision whatever the precision of the hourly rows, with a single pass of the aggregation kernel over them
+def build_daily_table(df):
+    df = sort_by_day_and_hour(df)
+    days = df["Day"].to_numpy()
+    starts = segment_starts(days)
+    statistics = segment_statistics(stack_columns([df[variable].to_numpy() for variable in VARIABLES]), starts, splits = SPLIT_INDICES)
+
+    columns = {}
+    for i, variable in enumerate(VARIABLES):
+        columns[f"{variable}_sum"] = statistics.sums[:, i]
+        columns[f"{variable}_min"] = statistics.minimums[:, i]
+        columns[f"{variable}_max"] = statistics.maximums[:, i]
+        with np.errstate(divide = 'ignore', invalid = 'ignore'): # Days without any value of a variable get a NaN mean
+            columns[f"{variable}_mean"] = statistics.sums[:, i] / statistics.counts[:, i]
+
+    # Splitting BESS into charging (negative) and discharging (positive) energy per day, and Grid into export and import
+    for i, (negative, positive) in enumerate(SPLITS.values()):
+        columns[negative] = statistics.charge[:, i]
+        columns[positive] = statistics.discharge[:, i]
+    columns["Rows"] = np.diff(np.append(starts, len(days))) # Number of hourly rows behind each day, used to weight the means of coarser tiers
+    return pd.DataFrame(columns, index = pd.Index(days[starts].astype(np.int64), name = "Day"))
+
+# Resolution tiers from finest to coarsest and the minimum number of points a chart should get from the chosen tier
+TIERS = ['hour', 'day', 'week', 'month', 'year']
+MIN_TIER_POINTS = 200
+
+# Function to return how each column of the daily table is rolled up into coarser periods (means are recomputed afterwards)
+def rollup_aggregations():
+    aggregations = dict.fromkeys(['Rows'] + SPLIT_COLUMNS, 'sum')
+    for variable in VARIABLES:
+        aggregations[f"{variable}_sum"] = 'sum'
+        aggregations[f"{variable}_min"] = 'min'
+        aggregations[f"{variable}_max"] = 'max'
+    return aggregations
+
+# Function to recompute the means of a rolled up table from its sums and row counts
+def with_means(rolled):
+    for variable in VARIABLES:
+        rolled[f"{variable}_mean"] = rolled[f"{variable}_sum"] / rolled["Rows"]
+    return rolled
+
+# Function to present hourly rows as a resolution tier, where every statistic of an hour is its own value
+def hour_tier_frame(df, x):
+    columns = {}
+    for variable in VARIABLES:
+        values = df[variable].to_numpy()
+        for statistic in STATISTICS:
+            columns[f"{variable}_{statistic}"] = values
+    return pd.DataFrame(columns, index = pd.Index(x, name = "Day"), copy = False)
+
+# Function to build the week, month and year tiers of the resolution pyramid by rolling up the daily table,
+# each indexed by the first Day number of its period so every tier shares the same x coordinates
+def build_pyramid(daily, start_date = DATA_START_DATE):
+    day_numbers = daily.index.to_numpy()
+    dates = days_to_dates(day_numbers, start_date)
+    keys = {
+        'week': (day_numbers - day_numbers[0]) // 7 if len(day_numbers) else day_numbers,
+        'month': dates.astype('datetime64[M]'),
+        'year': dates.astype('datetime64[Y]')
+    }
+
+    table = daily.reset_index()
+    pyramid = {'day': daily}
+    for tier, key in keys.items():
+        rolled = table.groupby(key).agg(dict(rollup_aggregations(), Day = 'min')).set_index('Day')
+        pyramid[tier] = with_means(rolled)[daily.columns]
+    return pyramid
+
+# Function to combine daily tables built from separate chunks of hourly rows, where a day may be split across chunks
+def combine_daily_tables(tables):
+    combined = pd.concat(tables).groupby(level = 0).agg(rollup_aggregations())
+    return with_means(combined)[tables[0].columns]
+
+# Function to sort the hourly rows by Day and Hours, keeping the original (possibly memory-mapped) frame when already in order
+def sort_by_day_and_hour(df):
+    days = df["Day"].to_numpy()
+    hours = df["Hours"].to_numpy()
+    in_order = np.all((days[1:] > days[:-1]) | ((days[1:] == days[:-1]) & (hours[1:] >= hours[:-1])))
+    if in_order:
+        return df
+    return df.sort_values(["Day", "Hours"], kind = "stable").reset_index(drop = True)
+
+# Function to return the cumulative sums (with a leading zero) of values in double precision, skipping blank values,
+# accumulating straight into the result
+def cumulative_sum(values):
+    sums = np.zeros(len(values) + 1)
+    np.nancumsum(values, dtype = np.float64, out = sums[1:])
+    return sums
+
+# Columns of the daily rollup accumulated by the daily cumulative sums, by key: the energy of every variable, the BESS and
+# Grid splits and the number of hourly rows (hours) behind the days
+DAILY_CUMULATIVE_COLUMNS = dict({variable: f"{variable}_sum" for variable in VARIABLES}, **{column: column for column in SPLIT_COLUMNS + ['Rows']})
+
+# Function to build cumulative sums (with a leading zero) over the rows of the daily rollup, so the energy of any
+# inclusive range of days is a difference of two entries
+def build_daily_cumulative_sums(daily):
+    return {key: cumulative_sum(daily[column].to_numpy()) for key, column in DAILY_CUMULATIVE_COLUMNS.items()}
+
+# Function to extend daily cumulative sums with the rows of the daily rollup from row start onwards (such as the days
+# touched by appended hourly rows), keeping the sums of the days before it instead of accumulating them again
+def extend_daily_cumulative_sums(sums, daily, start):
+    tail = daily.iloc[start:]
+    return {key: np.concatenate((sums[key][:start + 1], sums[key][start] + cumulative_sum(tail[column].to_numpy())[1:]))
+            for key, column in DAILY_CUMULATIVE_COLUMNS.items()}
+
+# Function to place sorted hourly rows (starting at row first_row) at their fraction of the day, for plotting hours on a Day axis
+def fractional_days(days, first_day, day_offsets, first_row = 0):
+    day_index = days.astype(np.int64) - first_day
+    first_rows = day_offsets[day_index]
+    rows = first_row + np.arange(len(days))
+    return days + (rows - first_rows) / (day_offsets[day_index + 1] - first_rows)
+
+# Function to precompute the first row of every Day number from the first to one past the last day,
+# so the rows of Day d are offsets[d - first_day]:offsets[d - first_day + 1]
+def build_day_offsets(days):
+    if len(days) == 0:
+        return 0, np.zeros(1, dtype = np.int64)
+    first_day = int(days[0])
+    offsets = np.searchsorted(days, np.arange(first_day, int(days[-1]) + 2), side = 'left')
+    return first_day, offsets
+
+# Function to extend the day offsets with the days of rows appended after the existing ones (rows old_rows onwards)
+def extend_day_offsets(first_day, day_offsets, days, old_rows):
+    if old_rows == 0:
+        return build_day_offsets(days)
+    last_day = first_day + len(day_offsets) - 2
+    new_days = days[old_rows:]
+    offsets = old_rows + np.searchsorted(new_days, np.arange(last_day + 1, int(new_days[-1]) + 2), side = 'left')
+    return first_day, np.concatenate((day_offsets[:-1], offsets))
+
+# Function to prepare appended rows: checking their columns, matching them to the existing frame and keeping only the
+# rows that come after the last (Day, Hours) already stored, so the store stays sorted and append-only (logging how many
+# rows were skipped)
+def rows_to_append(rows, frame):
+    check_schema(rows, "Appended rows")
+    rows = rows.copy()
+    for column in frame.columns:
+        if column not in rows.columns:
+            rows[column] = np.nan if frame[column].dtype.kind == 'f' else 0 # Optional columns absent from the new rows
+    rows = compact_frame(rows[list(frame.columns)].reset_index(drop = True))
+    for column in frame.columns:
+        if rows[column].dtype.kind == frame[column].dtype.kind:
+            # Stored with the types of the frame, widening an integer type only when the new values need it
+            rows[column] = rows[column].astype(np.promote_types(rows[column].dtype, frame[column].dtype))
+    rows = sort_by_day_and_hour(rows)
+    if len(frame):
+        last_day, last_hour = frame["Day"].iat[-1], frame["Hours"].iat[-1]
+        new_rows = rows[(rows["Day"] > last_day) | ((rows["Day"] == last_day) & (rows["Hours"] > last_hour))]
+        if len(new_rows) < len(rows):
+            logger.warning("Skipped %d of %d appended rows at or before the last stored row (Day %d, hour %d)",
+                           len(rows) - len(new_rows), len(rows), last_day, last_hour)
+        rows = new_rows
+    return rows
+
+# Class holding a growable copy of a column, so rows can be appended in amortized constant time while arrays
+# already handed out as views keep seeing only the rows that existed when they were taken
+class AppendBuffer:
+    def __init__(self, values):
+        values = np.asarray(values)
+        self.size = len(values)
+        self.data = np.empty(max(2 * self.size, 1024), dtype = values.dtype)
+        self.data[:self.size] = values
+
+    # Method to append values, doubling the capacity when it runs out and widening the type when the values need it
+    # (such as Day numbers past the range of the column's integer type)
+    def append(self, values):
+        end = self.size + len(values)
+        dtype = np.promote_types(self.data.dtype, np.asarray(values).dtype)
+        if end > len(self.data) or dtype != self.data.dtype:
+            grown = np.empty(max(2 * len(self.data), end) if end > len(self.data) else len(self.data), dtype = dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:end] = values
+        self.size = end
+
+    # Method to return the filled part of the buffer as a view
+    def view(self):
+        return self.data[:self.size]
+
+# Class with the queries shared by every data store, answered from the daily rollup, its cumulative sums and the resolution
+# pyramid. Stores provide start_date, version, daily, daily_cumulative and pyramid, plus day_frame() and hour_tier()
+# over their hourly rows
+class PowerStoreBase:
+    # Method to map dates to Day numbers of this data set
+    def day_numbers(self, dates):
+        return dates_to_days(dates, self.start_date)
+
+    # Method to map Day numbers of this data set back to dates
+    def day_dates(self, days):
+        return days_to_dates(days, self.start_date)
+
+    # Method to return the first and last dates covered by the data
+    def date_bounds(self):
+        return pd.Timestamp(self.day_dates(self.daily.index[0])).date(), pd.Timestamp(self.day_dates(self.daily.index[-1])).date()
+
+    # Method to pick the coarsest resolution tier that still gives at least min_points points for an inclusive range of Day numbers
+    def choose_tier(self, start_day, end_day, min_points = MIN_TIER_POINTS):
+        for tier in reversed(TIERS[1:]):
+            index = self.pyramid[tier].index
+            points = np.searchsorted(index, end_day, side = 'right') - max(np.searchsorted(index, start_day, side = 'right') - 1, 0)
+            if points >= min_points:
+                return tier
+        return 'hour'
+
+    # Method to return the rows of a resolution tier covering an inclusive range of Day numbers, indexed by (fractional) Day
+    def tier_range(self, tier, start_day, end_day):
+        if tier == 'hour':
+            return self.hour_tier(start_day, end_day)
+
+        # Including the period that contains the first day, which may have started before it
+        table = self.pyramid[tier]
+        start = max(int(np.searchsorted(table.index, start_day, side = 'right')) - 1, 0)
+        stop = int(np.searchsorted(table.index, end_day, side = 'right'))
+        return table.iloc[start:stop]
+
+    # Method to return the minimum and maximum columns of the daily rollup as one float64 matrix, built once per version of the rollup
+    def extremes_matrix(self):
+        cached = getattr(self, "_extremes_matrix", None)
+        if cached is None or cached[0] is not self.daily:
+            cached = self._extremes_matrix = (self.daily, stack_columns([self.daily[column].to_numpy() for column in EXTREME_COLUMNS]))
+        return cached[1]
+
+    # Method to return the lowest and highest value of every variable over an inclusive range of Day numbers, as two arrays in
+    # the order of VARIABLES (NaN when no day is selected), from one pass of the kernel over their rows of the daily rollup
+    def day_extremes(self, start_day, end_day):
+        start = int(np.searchsorted(self.daily.index, start_day, side = 'left'))
+        stop = int(np.searchsorted(self.daily.index, end_day, side = 'right'))
+        if stop <= start:
+            return np.full(len(VARIABLES), np.nan), np.full(len(VARIABLES), np.nan)
+        statistics = segment_statistics(self.extremes_matrix()[start:stop], [0])
+        n = len(VARIABLES)
+        return statistics.minimums[0, :n], statistics.maximums[0, n:]
+
+    # Method to return the ratings of the equipment estimated from the daily rollup, computed once per version of the rollup:
+    # the highest hourly Electrolyzer power as its rated power and the most energy charged into the BESS in a day as its capacity
+    def estimated_ratings(self):
+        cached = getattr(self, "_estimated_ratings", None)
+        if cached is None or cached[0] is not self.daily:
+            estimates = dict(
+                Electrolyzer = float(np.nanmax(self.daily["Electrolyzer_max"].to_numpy())),
+                BESS = float(-np.nanmin(self.daily["BESS_charge"].to_numpy()))
+            )
+            cached = self._estimated_ratings = (self.daily, estimates)
+        return cached[1]
+
+    # Method to return the totals of the daily cumulative sums (the energy of every variable, the BESS and Grid splits and
+    # the number of hours) over consecutive periods of days, given the first Day number of every period and the last Day
+    # number of the final one. Each period takes two lookups however many days it spans
+    def period_totals(self, period_days, end_day):
+        bounds = np.searchsorted(self.daily.index, np.append(np.asarray(period_days, dtype = np.int64), end_day + 1), side = 'left')
+        bounds = np.maximum.accumulate(bounds) # Periods starting after the end day are left empty
+        return {key: np.diff(sums[bounds]) for key, sums in self.daily_cumulative.items()}
+
+    # Method to return the kernel statistics of every variable over the hourly rows of a day, optionally narrowed to an
+    # inclusive range of hours, as a single segment (without any row when no row is selected)
+    def hour_statistics(self, day, min_hour = None, max_hour = None):
+        rows = self.day_frame(day, min_hour, max_hour)
+        return segment_statistics(stack_columns([rows[variable].to_numpy() for variable in VARIABLES]), [0], splits = SPLIT_INDICES)
+
+# Function to derive the structures a PowerStore answers its queries from out of sorted hourly rows: the day offsets,
+# the timestamps of the rows, the daily rollup with the resolution pyramid and its cumulative sums
+def derive_structures(df, start_date = DATA_START_DATE):
+    days = df["Day"].to_numpy()
+    first_day, day_offsets = build_day_offsets(days)
+    daily = build_daily_table(df)
+    return dict(
+        first_day = first_day,
+        day_offsets = day_offsets,
+        timestamps = build_timestamps(days, first_day, day_offsets, start_date),
+        daily = daily,
+        pyramid = build_pyramid(daily, start_date),
+        daily_cumulative = build_daily_cumulative_sums(daily)
+    )
+
+# Function to return the version of the store made by appending rows to a store of the given version, derived from both
+# so that stores holding different rows never share a version (such as two appends to the same older snapshot)
+def appended_version(version, rows):
+    digest = hashlib.sha256(str(version).encode())
+    digest.update(pd.util.hash_pandas_object(rows, index = False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+# Class holding the loaded power data in memory together with the structures derived from it once at load time,
+# or attached to the derived structures another process already wrote (see load_power_store)
+class PowerStore(PowerStoreBase):
+    def __init__(self, df, start_date = DATA_START_DATE, version = None, derived = None):
+        self.start_date = start_date
+        # Identifies the data set (the hash of its source when loaded from one), so anything cached from it can be told apart
+        # from other data sets and later versions. Rows of unknown source get a version of their own
+        self.version = version if version is not None else uuid.uuid4().hex[:16]
+        self.frame = sort_by_day_and_hour(df).copy(deep = False) # Shallow copy, so setting the index never touches the caller's frame
+        self.days = self.frame["Day"].to_numpy()
+        self.hours = self.frame["Hours"].to_numpy()
+        if derived is None:
+            derived = derive_structures(self.frame, start_date)
+        self.first_day, self.day_offsets = derived["first_day"], derived["day_offsets"]
+        self.frame.index = derived["timestamps"]
+        self.daily = derived["daily"]
+        self.daily_cumulative = derived["daily_cumulative"]
+        self.pyramid = derived["pyramid"]
+        self._buffers = None # Growable copies of the columns and timestamps, created by the first append
+
+    # Method to return a new store with rows appended, extending the day offsets, daily rollup and its cumulative sums
+    # incrementally instead of rebuilding them. The rows of the store are left untouched, so sessions still reading it see
+    # a consistent snapshot. The growable buffers move to the returned store, so appending to this store again copies
+    # its columns into new buffers rather than writing over rows the returned store already holds
+    def append(self, rows):
+        rows = rows_to_append(rows, self.frame)
+        if len(rows) == 0:
+            return self
+
+        if self._buffers is None:
+            self._buffers = dict(
+                columns = {column: AppendBuffer(self.frame[column].to_numpy()) for column in self.frame.columns},
+                timestamps = AppendBuffer(self.frame.index.to_numpy())
+            )
+        buffers = self._buffers
+        old_rows = len(self.frame)
+
+        store = copy.copy(self)
+        store.version = appended_version(self.version, rows)
+        store._buffers, self._buffers = buffers, None # Only the newest store may grow the buffers
+
+        # Appending the hourly rows
+        for column in self.frame.columns:
+            buffers["columns"][column].append(rows[column].to_numpy())
+
+        # Rebuilding the frame as views of the buffers and extending the day offsets and timestamps with the new rows
+        store.frame = pd.DataFrame({column: values.view() for column, values in buffers["columns"].items()}, copy = False)
+        store.days = store.frame["Day"].to_numpy()
+        store.hours = store.frame["Hours"].to_numpy()
+        store.first_day, store.day_offsets = extend_day_offsets(self.first_day, self.day_offsets, store.days, old_rows)
+        timestamps = build_timestamps(store.days[old_rows:], store.first_day, store.day_offsets, self.start_date, old_rows)
+        buffers["timestamps"].append(timestamps.to_numpy())
+        store.frame.index = pd.DatetimeIndex(buffers["timestamps"].view(), name = "Timestamp")
+
+        # Recomputing the daily rollup only from the first day touched by the new rows onwards
+        first_new_day = int(rows["Day"].iat[0])
+        start, _ = store.row_range(first_new_day, first_new_day)
+        kept = int(np.searchsorted(self.daily.index, first_new_day, side = 'left')) # Days before the first touched day
+        store.daily = pd.concat([self.daily.iloc[:kept], build_daily_table(store.frame.iloc[start:])])
+        store.daily_cumulative = extend_daily_cumulative_sums(self.daily_cumulative, store.daily, kept)
+        store.pyramid = build_pyramid(store.daily, self.start_date) # Rolled up from the daily table, so proportional to days, not hours
+        return store
+
+    # Method to return the [start, stop) row window covering an inclusive range of Day numbers with two offset lookups
+    def row_range(self, start_day, end_day):
+        last = len(self.day_offsets) - 1
+        start = min(max(int(start_day) - self.first_day, 0), last)
+        stop = min(max(int(end_day) - self.first_day + 1, 0), last)
+        return int(self.day_offsets[start]), int(self.day_offsets[max(start, stop)])
+
+    # Method to narrow a single-day row window to an inclusive range of hours
+    def hour_range(self, start, stop, min_hour, max_hour):
+        hours = self.hours[start:stop]
+        return start + int(np.searchsorted(hours, min_hour, side = 'left')), start + int(np.searchsorted(hours, max_hour, side = 'right'))
+
+    # Method to return the hourly rows of a day, optionally narrowed to an inclusive range of hours, as a slice view
+    def day_frame(self, day, min_hour = None, max_hour = None):
+        start, stop = self.row_range(day, day)
+        if min_hour is not None:
+            start, stop = self.hour_range(start, stop, min_hour, max_hour)
+        return self.frame.iloc[start:stop]
+
+    # Method to return the kernel statistics of every variable over the hourly rows of a day, optionally narrowed to an
+    # inclusive range of hours, slicing the columns directly rather than going through a frame
+    def hour_statistics(self, day, min_hour = None, max_hour = None):
+        start, stop = self.row_range(day, day)
+        if min_hour is not None:
+            start, stop = self.hour_range(start, stop, min_hour, max_hour)
+        cached = getattr(self, "_variable_columns", None)
+        if cached is None or cached[0] is not self.frame:
+            cached = self._variable_columns = (self.frame, [self.frame[variable].to_numpy() for variable in VARIABLES])
+        return segment_statistics(stack_columns([values[start:stop] for values in cached[1]]), [0], splits = SPLIT_INDICES)
+
+    # Method to return the hourly rows of an inclusive range of Day numbers as a resolution tier
+    def hour_tier(self, start_day, end_day):
+        start, stop = self.row_range(start_day, end_day)
+        x = fractional_days(self.days[start:stop], self.first_day, self.day_offsets, start)
+        return hour_tier_frame(self.frame.iloc[start:stop], x)
+
+# Function to write the derived structures of a store next to its columnar cache, one .npy file per array in a build
+# subdirectory keyed by the key (source hash and start date) they were derived for, with a manifest recording the key and
+# pointing at that build. Every table is written index first
+def write_derived_cache(derived, directory, key):
+    build = build_name(key)
+    build_directory = os.path.join(directory, build)
+    tables = {}
+    for tier, table in derived["pyramid"].items():
+        arrays = {table.index.name: table.index.to_numpy()}
+        arrays.update((column, table[column].to_numpy()) for column in table.columns)
+        tables[tier] = write_arrays(build_directory, tier, arrays)
+    manifest = dict(
+        format = CACHE_FORMAT,
+        key = key,
+        build = build,
+        first_day = int(derived["first_day"]),
+        arrays = write_arrays(build_directory, "array", dict(day_offsets = derived["day_offsets"], timestamps = derived["timestamps"].to_numpy())),
+        daily_cumulative = write_arrays(build_directory, "daily_cumulative", derived["daily_cumulative"]),
+        tables = tables
+    )
+    return publish_build(directory, manifest)
+
+# Function to open the derived structures written by write_derived_cache as read-only memory maps, without copying them
+def read_derived_cache(directory, manifest):
+    directory = os.path.join(directory, manifest["build"])
+    arrays = read_arrays(directory, manifest["arrays"])
+    pyramid = {}
+    for tier, entries in manifest["tables"].items():
+        columns = read_arrays(directory, entries)
+        index_name = entries[0][0]
+        index = pd.Index(columns.pop(index_name), name = index_name, copy = False)
+        pyramid[tier] = pd.DataFrame(columns, index = index, copy = False)
+    return dict(
+        first_day = manifest["first_day"],
+        day_offsets = arrays["day_offsets"],
+        timestamps = pd.DatetimeIndex(arrays["timestamps"], name = "Timestamp", copy = False),
+        daily = pyramid['day'],
+        pyramid = pyramid,
+        daily_cumulative = read_arrays(directory, manifest["daily_cumulative"])
+    )
+
+# Function to load the power data as a PowerStore whose hourly columns and derived structures are all read-only memory maps,
+# so every server process on the machine shares a single copy of them through the page cache instead of holding its own.
+# The first process to load a new version of the workbook derives the structures and writes them for the others
+def load_power_store(path = DATA_FILE, sheet_name = DATA_SHEET, usecols = DATA_COLUMNS, nrows = DATA_ROWS, cache_dir = CACHE_DIR,
+                     start_date = DATA_START_DATE, check_precision = False):
+    df = load_power_data(path, sheet_name, usecols, nrows, cache_dir, check_precision)
+    directory = cache_path(path, sheet_name, cache_dir)
+    return attach_power_store(df, directory, read_manifest(directory)["sha256"], start_date)
+
+# Function to build a PowerStore over the hourly rows of a columnar cache directory, attaching to the derived structures
+# in its derived/ subdirectory or deriving and writing them first when they are missing or were derived from other data
+def attach_power_store(df, directory, sha256, start_date = DATA_START_DATE):
+    directory = os.path.join(directory, "derived")
+    key = dict(sha256 = sha256, start_date = start_date.isoformat())
+    manifest = read_manifest(directory)
+    if manifest is None or manifest.get("format") != CACHE_FORMAT or manifest.get("key") != key:
+        manifest = write_derived_cache(derive_structures(sort_by_day_and_hour(df), start_date), directory, key)
+    return PowerStore(df, start_date, version = sha256[:16], derived = read_derived_cache(directory, manifest))
@@ -0,0 +1,167 @@
+# Importing the necessary libraries
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Files of the profiling output, one per server process (named after its pid), since several processes may serve the
+# dashboard on one machine and neither file can be shared between them
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "profile")
+PROFILE_LOG_FILE = os.path.join(PROFILE_DIR, "reruns-{pid}.jsonl") # One JSON record per rerun, rotated at PROFILE_LOG_BYTES
+PROFILE_LOG_BYTES = 5 * 1024 * 1024
+METRICS_FILE = os.path.join(PROFILE_DIR, "metrics-{pid}.prom") # Prometheus text exposition of the aggregated metrics
+METRICS_INTERVAL = 5 # Minimum seconds between two rewrites of the metrics file
+
+_local = threading.local() # Every Streamlit session runs its script in its own thread, which holds the profile of its rerun
+
+# Class collecting the stage timings, chart payload sizes and cache hits of one rerun
+class RerunProfile:
+    def __init__(self, tab, detailed = False):
+        self.tab = tab
+        self.detailed = detailed # Whether payload sizes are measured, which costs an extra serialization per chart
+        self.started = time.perf_counter()
+        self.stages = defaultdict(float)
+        self.payloads = {}
+        self.cache = defaultdict(int)
+        self.seconds = None
+
+    # Method to return the rerun as a JSON-serializable record
+    def record(self):
+        return dict(
+            time = time.time(),
+            tab = self.tab,
+            seconds = self.seconds,
+            stages = dict(self.stages),
+            payload_bytes = self.payloads,
+            cache = dict(self.cache)
+        )
+
+# Class aggregating the profiles of every rerun of the server process and writing them as Prometheus metrics, labelled
+# with the pid of the process so the files of every process can be collected together
+class MetricsRegistry:
+    def __init__(self):
+        self.stage_seconds = defaultdict(float)
+        self.stage_counts = defaultdict(int)
+        self.reruns = defaultdict(int)
+        self.payload_bytes = {}
+        self.cache = defaultdict(int)
+        self.written = 0.0
+        self._lock = threading.Lock()
+
+    # Method to add the profile of a finished rerun to the aggregated metrics
+    def add(self, profile):
+        with self._lock:
+            self.reruns[profile.tab] += 1
+            for name, seconds in profile.stages.items():
+                self.stage_seconds[(profile.tab, name)] += seconds
+                self.stage_counts[(profile.tab, name)] += 1
+            for chart, size in profile.payloads.items():
+                self.payload_bytes[(profile.tab, chart)] = size
+            for outcome, count in profile.cache.items():
+                self.cache[outcome] += count
+
+    # Method to render the aggregated metrics in the Prometheus text exposition format
+    def prometheus_text(self):
+        pid = f'pid="{os.getpid()}"'
+        with self._lock:
+            lines = [
+                "# HELP dashboard_reruns_total Reruns of the dashboard script per tab",
+                "# TYPE dashboard_reruns_total counter"
+            ]
+            lines += [f'dashboard_reruns_total{{{pid},tab="{tab}"}} {count}' for tab, count in sorted(self.reruns.items())]
+            lines += [
+                "# HELP dashboard_stage_seconds Time spent in each stage of a rerun",
+                "# TYPE dashboard_stage_seconds summary"
+            ]
+            for (tab, name), seconds in sorted(self.stage_seconds.items()):
+                lines.append(f'dashboard_stage_seconds_sum{{{pid},tab="{tab}",stage="{name}"}} {seconds:.6f}')
+                lines.append(f'dashboard_stage_seconds_count{{{pid},tab="{tab}",stage="{name}"}} {self.stage_counts[(tab, name)]}')
+            lines += [
+                "# HELP dashboard_chart_payload_bytes Size of the last serialized figure sent for each chart",
+                "# TYPE dashboard_chart_payload_bytes gauge"
+            ]
+            lines += [f'dashboard_chart_payload_bytes{{{pid},tab="{tab}",chart="{chart}"}} {size}' for (tab, chart), size in sorted(self.payload_bytes.items())]
+            lines += [
+                "# HELP dashboard_figure_cache_total Figure cache lookups by outcome",
+                "# TYPE dashboard_figure_cache_total counter"
+            ]
+            lines += [f'dashboard_figure_cache_total{{{pid},outcome="{outcome}"}} {count}' for outcome, count in sorted(self.cache.items())]
+            return "\n".join(lines) + "\n"
+
+    # Method to rewrite the metrics file of the process, at most once every METRICS_INTERVAL seconds
+    def write(self, path = None, force = False):
+        now = time.monotonic()
+        if not force and now - self.written < METRICS_INTERVAL:
+            return
+        self.written = now
+        path = path or METRICS_FILE.format(pid = os.getpid())
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as handle:
+            handle.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+metrics = MetricsRegistry() # Metrics of the whole server process
+
+# Function to create the logger writing one JSON record per rerun to a rotating file of the process
+def get_profile_logger():
+    logger = logging.getLogger("dashboard.profile")
+    if not logger.handlers:
+        os.makedirs(PROFILE_DIR, exist_ok = True)
+        handler = logging.handlers.RotatingFileHandler(PROFILE_LOG_FILE.format(pid = os.getpid()), maxBytes = PROFILE_LOG_BYTES, backupCount = 3)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+# Function to start profiling the rerun running in the current thread
+def start_rerun(tab, detailed = False):
+    _local.profile = RerunProfile(tab, detailed)
+    return _local.profile
+
+# Function to return the profile of the rerun running in the current thread, or None outside a profiled rerun
+def current_profile():
+    return getattr(_local, "profile", None)
+
+# Context manager adding the time spent in its block to a stage of the current rerun
+@contextmanager
+def stage(name):
+    profile = current_profile()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.stages[name] += time.perf_counter() - started
+
+# Function to record the serialized size of a chart's figure, when the current rerun measures payloads
+def record_payload(chart, fig):
+    profile = current_profile()
+    if profile is not None and profile.detailed:
+        profile.payloads[chart] = len(fig.to_json())
+
+# Function to count a figure cache hit or miss in the current rerun
+def record_cache(hit):
+    profile = current_profile()
+    if profile is not None:
+        profile.cache["hit" if hit else "miss"] += 1
+
+# Function to finish profiling the current rerun, logging it and adding it to the process metrics
+def finish_rerun():
+    profile = current_profile()
+    if profile is None:
+        return None
+    _local.profile = None
+    profile.seconds = time.perf_counter() - profile.started
+    metrics.add(profile)
+    try:
+        get_profile_logger().info(json.dumps(profile.record()))
+        metrics.write()
+    except OSError:
+        pass # Profiling output is best effort and must never break a rerun
+    return profile
@@ -0,0 +1,80 @@
+# Queries computing the energy totals and series shown by the dashboard, kept separate from rendering so the graphs
+# (charts.py) and the headless query API (api.py) answer from the same data store with the same code
+
+# Importing the necessary libraries
+import numpy as np
+import pandas as pd
+from power_data import SPLITS, VARIABLES
+from profiling import stage
+
+BESS_SPLIT = list(SPLITS).index('BESS') # Index of the BESS charging and discharging split among the kernel's split columns
+
+# Function to check that every requested data type is a variable of the data, raising ValueError otherwise
+def check_variables(variables):
+    unknown = [variable for variable in variables if variable not in VARIABLES]
+    if unknown:
+        raise ValueError(f"Unknown variables: {', '.join(unknown)} (expected any of {', '.join(VARIABLES)})")
+    return list(variables)
+
+# Class holding the energy (MWh) and the lowest and highest power (MW) of every variable over a selection, with the BESS
+# energy split into charging (negative) and discharging
+class EnergySummary:
+    def __init__(self, energy, minimum, maximum, charging, discharging):
+        self.energy = energy
+        self.minimum = minimum
+        self.maximum = maximum
+        self.charging = charging
+        self.discharging = discharging
+
+    # Method to return the energy of each of the given variables, in their order
+    def energies(self, variables):
+        return {variable: self.energy[variable] for variable in variables}
+
+    # Method to return the combined energy of the given variables
+    def total(self, variables):
+        return sum(self.energy[variable] for variable in variables)
+
+# Function to return the energy summary of an inclusive range of Day numbers, optionally narrowed to an inclusive range
+# of hours when the range is a single day. A longer range takes its energies and BESS split from two lookups in the daily
+# cumulative sums and only its lowest and highest values from the kernel over the daily rollup. A single day is summarized
+# by one pass of the kernel over its (at most 24) hourly rows, which costs no more than lookups in hourly cumulative sums
+# would, without keeping such sums the length of the hourly data in memory and on disk for every store
+def energy_summary(store, start_day, end_day, min_hour = None, max_hour = None):
+    with stage("aggregate"):
+        if start_day != end_day:
+            totals = store.period_totals([start_day], end_day)
+            minimums, maximums = store.day_extremes(start_day, end_day)
+            charging, discharging = SPLITS['BESS']
+            return EnergySummary(
+                {variable: float(totals[variable][0]) for variable in VARIABLES},
+                dict(zip(VARIABLES, minimums.tolist())),
+                dict(zip(VARIABLES, maximums.tolist())),
+                float(totals[charging][0]),
+                float(totals[discharging][0])
+            )
+        statistics = store.hour_statistics(start_day, min_hour, max_hour)
+        if len(statistics.sums) == 0: # Nothing selected, so no energy and no power values
+            return EnergySummary(dict.fromkeys(VARIABLES, 0.0), dict.fromkeys(VARIABLES, np.nan), dict.fromkeys(VARIABLES, np.nan), 0.0, 0.0)
+        return EnergySummary(
+            dict(zip(VARIABLES, statistics.sums[0].tolist())),
+            dict(zip(VARIABLES, statistics.minimums[0].tolist())),
+            dict(zip(VARIABLES, statistics.maximums[0].tolist())),
+            float(statistics.charge[0, BESS_SPLIT]),
+            float(statistics.discharge[0, BESS_SPLIT])
+        )
+
+# Function to return the hourly rows of a day, optionally narrowed to an inclusive range of hours
+def daily_series(store, day, min_hour = None, max_hour = None):
+    with stage("filter"):
+        return store.day_frame(day, min_hour, max_hour)
+
+# Function to return the resolution tier picked for an inclusive range of Day numbers together with its rows,
+# which hold the sum, minimum, maximum and mean of every variable per period
+def range_series(store, start_day, end_day):
+    with stage("filter"):
+        tier = store.choose_tier(start_day, end_day)
+        return tier, store.tier_range(tier, start_day, end_day)
+
+# Function to map (fractional) Day numbers of a data store to timestamps, rounded to the second
+def day_timestamps(store, days):
+    return (pd.Timestamp(store.start_date) + pd.to_timedelta(np.asarray(days, dtype = np.float64) - 1, unit = "D")).round("s")
@@ -0,0 +1,57 @@
+# Comparison of several hydrogen sites, each with its own data store: a workbook of its own, or its partition of the
+# Parquet dataset. The totals and min/max series of every compared site are computed concurrently by a thread pool over
+# the stores' memory-mapped columns or Parquet scans (whose NumPy reductions and reads release the interpreter lock), so
+# overlaying several sites costs about as much as the slowest site rather than the sum of them all
+
+# Importing the necessary libraries
+import os
+from concurrent.futures import ThreadPoolExecutor
+from power_data import load_power_store
+from queries import energy_summary, range_series
+from warmup import prepare_power_store
+
+SITE_WORKERS = 8 # Sites computed (or loaded) at once
+
+# Function to create the thread pool computing the sites of comparisons, shared by every session of the server
+def site_pool(workers = SITE_WORKERS):
+    return ThreadPoolExecutor(max_workers = workers, thread_name_prefix = "site")
+
+# Function to load the workbooks of several sites concurrently, given their workbook settings by site name. The caches of
+# stale workbooks are built by one worker process per site (see prepare_power_store), so the Excel parses run in parallel
+def load_site_workbooks(sites, pool):
+    def load(settings):
+        prepare_power_store(**settings)
+        return load_power_store(**settings)
+    return dict(zip(sites, pool.map(load, sites.values())))
+
+# Function to return the names of the sites of a Parquet dataset partitioned by site and year (see partitioned_store.py)
+def dataset_sites(root):
+    return sorted(name.split("=", 1)[1] for name in os.listdir(root) if name.startswith("Site=") and os.path.isdir(os.path.join(root, name)))
+
+# Class holding what the comparison shows of one site over a date range: the store it was computed from, the resolution
+# tier and its rows (sum, minimum, maximum and mean of every variable per period) and the energy summary of the range
+class SiteComparison:
+    def __init__(self, site, store, tier, series, summary):
+        self.site = site
+        self.store = store
+        self.tier = tier
+        self.series = series
+        self.summary = summary
+
+# Function to compare one site over an inclusive range of dates, clipped to the dates the site has data for,
+# returning None when it has no data in the range
+def compare_site(site, store, start_date, end_date):
+    first_date, last_date = store.date_bounds()
+    start_date, end_date = max(start_date, first_date), min(end_date, last_date)
+    if start_date > end_date:
+        return None
+    start_day, end_day = store.day_numbers([start_date, end_date]).tolist() # Day numbers of the site, which may start on another date
+    tier, series = range_series(store, start_day, end_day)
+    return SiteComparison(site, store, tier, series, energy_summary(store, start_day, end_day))
+
+# Function to compare sites over an inclusive range of dates, given their stores by site name, computing every site
+# in the pool at once. Returns the comparisons by site name, in the order of the stores, without the sites lacking data
+def compare_sites(stores, start_date, end_date, pool):
+    futures = {site: pool.submit(compare_site, site, store, start_date, end_date) for site, store in stores.items()}
+    comparisons = {site: future.result() for site, future in futures.items()}
+    return {site: comparison for site, comparison in comparisons.items() if comparison is not None}
@@ -0,0 +1,99 @@
+# Background warm-up of the dashboard: loads the data store and builds the graphs a new session opens on while the
+# server keeps answering, so no user pays for the Excel parse, the derived structures or the first graphs in a request
+#
+# Usage (for example as a deploy step, before starting the server):
+#     python warmup.py [workbook [sheet [columns [rows]]]] [--check-precision]
+
+# Importing the necessary libraries
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from charts import GRAPH_VARIABLES, cached_custom_date_chart, cached_daily_chart
+from downsampling import METHODS
+from power_data import DATA_COLUMNS, DATA_FILE, DATA_ROWS, DATA_SHEET, load_power_store
+
+PRESET_RANGES = [7, 30, 365, None] # Custom date ranges warmed, in days ending on the last day (None is the whole data set)
+CHECK_PRECISION_FLAG = "--check-precision" # Compares the float32 columns with their float64 totals when building the cache
+
+logger = logging.getLogger(__name__)
+
+# Function to build the columnar and derived caches of a workbook in a worker process running this module, so the
+# openpyxl parse and the rollups never hold the server's interpreter lock; the server then only attaches to the files
+# the worker wrote. A separate interpreter is used rather than multiprocessing, which would re-run the Streamlit script
+def prepare_power_store(path = DATA_FILE, sheet_name = DATA_SHEET, usecols = DATA_COLUMNS, nrows = DATA_ROWS, check_precision = False):
+    command = [sys.executable, os.path.abspath(__file__), path, sheet_name, usecols, str(nrows)]
+    if check_precision:
+        command.append(CHECK_PRECISION_FLAG)
+    result = subprocess.run(command, capture_output = True, text = True)
+    if result.returncode != 0:
+        message = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit code {result.returncode}"
+        raise RuntimeError(f"Building the data caches failed: {message}")
+
+# Function to return the graph selections warmed for a store: the selection each tab opens on and the most common
+# custom date ranges, each with no and with every data type of the graph selected
+def figure_presets(store):
+    days = store.daily.index
+    first_day, last_day = int(days[0]), int(days[-1])
+    hours = store.day_frame(first_day)["Hours"]
+    presets = []
+    for graph, options in GRAPH_VARIABLES.items():
+        for variables in ([], options):
+            presets.append(("daily", graph, (first_day, int(hours.min()), int(hours.max())), variables))
+            presets.append(("custom_date", graph, (first_day, min(first_day + 1, last_day)), variables))
+            for width in PRESET_RANGES:
+                start_day = first_day if width is None else max(first_day, last_day - width + 1)
+                presets.append(("custom_date", graph, (start_day, last_day), variables))
+    return presets
+
+# Function to build the preset graphs of a store into the figure cache, with the default downsampling settings of the sidebar
+def warm_figures(store, figure_cache):
+    for tab, graph, selection, variables in figure_presets(store):
+        if tab == "daily":
+            cached_daily_chart(figure_cache, store, graph, *selection, variables)
+        else:
+            cached_custom_date_chart(figure_cache, store, graph, *selection, variables, METHODS[0], True)
+
+# Class running the warm-up in a background thread and reporting its progress to the sessions waiting for it
+class WarmUp:
+    def __init__(self, load, figure_cache):
+        self.load = load # Function returning the live store, with any background services already started
+        self.figure_cache = figure_cache
+        self.live = None # Set as soon as the data is loaded, so sessions can start while the graphs are still being built
+        self.error = None
+        self.stage = "loading data"
+        self.started = time.monotonic()
+        self.done = threading.Event()
+
+    # Method to start the warm-up thread and return the warm-up
+    def start(self):
+        threading.Thread(target = self.run, name = "warm-up", daemon = True).start()
+        return self
+
+    # Method to load the data and build the preset graphs, recording any failure for the sessions to show
+    def run(self):
+        try:
+            self.live = self.load()
+            self.stage = "building graphs"
+            warm_figures(self.live.current, self.figure_cache)
+            self.stage = "ready"
+            logger.info("Warm-up finished in %.1f s", self.elapsed())
+        except Exception as error: # Any failure is shown to the sessions instead of leaving them waiting
+            logger.exception("Warm-up failed")
+            self.error = error
+        finally:
+            self.done.set()
+
+    # Method to return the seconds since the warm-up started
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+# Building the caches of a workbook from the command line, so even the first server process starts warm
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != CHECK_PRECISION_FLAG]
+    settings = dict(zip(["path", "sheet_name", "usecols", "nrows"], args), check_precision = CHECK_PRECISION_FLAG in sys.argv[1:])
+    if "nrows" in settings:
+        settings["nrows"] = None if settings["nrows"] == "None" else int(settings["nrows"]) # None reads the whole sheet
+    load_power_store(**settings)